@@ -0,0 +1,29 @@
+"""shortlink expansion cache table
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'shortlink_expansions',
+        sa.Column('short_url', sa.String(length=255), primary_key=True),
+        sa.Column('expanded_url', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('shortlink_expansions')
@@ -0,0 +1,32 @@
+"""denormalized routes.open_count
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('routes', sa.Column('open_count', sa.Integer(), nullable=False, server_default='0'))
+    op.execute(
+        "UPDATE routes SET open_count = "
+        "(SELECT COUNT(*) FROM route_open_events e WHERE e.route_id = routes.id)"
+    )
+    op.create_index('ix_routes_region1_open_count', 'routes', ['region1', 'open_count'])
+    op.create_index('ix_routes_open_count', 'routes', ['open_count'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_routes_open_count', table_name='routes')
+    op.drop_index('ix_routes_region1_open_count', table_name='routes')
+    op.drop_column('routes', 'open_count')
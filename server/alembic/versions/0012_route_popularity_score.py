@@ -0,0 +1,29 @@
+"""stored routes.popularity_score for sort=popular
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('routes', sa.Column('popularity_score', sa.Integer(), nullable=False, server_default='0'))
+    op.execute("UPDATE routes SET popularity_score = COALESCE(like_count, 0) * 2 + COALESCE(comment_count, 0)")
+    op.create_index('ix_routes_region1_popularity_score', 'routes', ['region1', 'popularity_score'])
+    op.create_index('ix_routes_popularity_score', 'routes', ['popularity_score'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_routes_popularity_score', table_name='routes')
+    op.drop_index('ix_routes_region1_popularity_score', table_name='routes')
+    op.drop_column('routes', 'popularity_score')
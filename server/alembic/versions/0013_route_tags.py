@@ -0,0 +1,43 @@
+"""route_tags inverted index over routes.tags_bitmask
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0013'
+down_revision = '0012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'route_tags',
+        sa.Column('tag_bit', sa.Integer(), primary_key=True),
+        sa.Column('route_id', sa.Integer(), sa.ForeignKey('routes.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('region1', sa.String(length=100), nullable=True),
+    )
+    op.create_index('ix_route_tags_tag_bit_region1', 'route_tags', ['tag_bit', 'region1', 'route_id'])
+    op.create_index('ix_route_tags_route_id', 'route_tags', ['route_id'])
+    # backfill one bit at a time; bit 63 is the sign bit of the BIGINT column
+    for bit in range(64):
+        mask = -(1 << 63) if bit == 63 else (1 << bit)
+        op.execute(
+            sa.text(
+                "INSERT INTO route_tags (tag_bit, route_id, region1) "
+                "SELECT :bit, id, region1 FROM routes "
+                "WHERE tags_bitmask IS NOT NULL AND (tags_bitmask & :mask) != 0"
+            ).bindparams(bit=bit, mask=mask)
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_route_tags_route_id', table_name='route_tags')
+    op.drop_index('ix_route_tags_tag_bit_region1', table_name='route_tags')
+    op.drop_table('route_tags')
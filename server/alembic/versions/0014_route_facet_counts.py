@@ -0,0 +1,43 @@
+"""precomputed facet counts per region1/region2/tag bit
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0014'
+down_revision = '0013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'route_facet_counts',
+        sa.Column('region1', sa.String(length=100), primary_key=True),
+        sa.Column('region2', sa.String(length=100), primary_key=True),
+        sa.Column('tag_bit', sa.Integer(), primary_key=True),
+        sa.Column('route_count', sa.Integer(), nullable=False, server_default='0'),
+    )
+    # tag_bit -1: every route in the region cell
+    op.execute(
+        "INSERT INTO route_facet_counts (region1, region2, tag_bit, route_count) "
+        "SELECT COALESCE(region1, ''), COALESCE(region2, ''), -1, COUNT(*) FROM routes "
+        "GROUP BY COALESCE(region1, ''), COALESCE(region2, '')"
+    )
+    # per tag bit, from the route_tags index created in 0013
+    op.execute(
+        "INSERT INTO route_facet_counts (region1, region2, tag_bit, route_count) "
+        "SELECT COALESCE(r.region1, ''), COALESCE(r.region2, ''), t.tag_bit, COUNT(*) "
+        "FROM route_tags t JOIN routes r ON r.id = t.route_id "
+        "GROUP BY COALESCE(r.region1, ''), COALESCE(r.region2, ''), t.tag_bit"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('route_facet_counts')
@@ -0,0 +1,24 @@
+"""routes.revision version stamp for ETags
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0015'
+down_revision = '0014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('routes', sa.Column('revision', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('routes', 'revision')
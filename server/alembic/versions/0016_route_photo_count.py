@@ -0,0 +1,28 @@
+"""denormalized routes.photo_count
+
+Revision ID: 0016
+Revises: 0015
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0016'
+down_revision = '0015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('routes', sa.Column('photo_count', sa.Integer(), nullable=False, server_default='0'))
+    op.execute(
+        "UPDATE routes SET photo_count = "
+        "(SELECT COUNT(*) FROM route_photos WHERE route_photos.route_id = routes.id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('routes', 'photo_count')
@@ -0,0 +1,54 @@
+"""route_points.cell spatial grid index
+
+Revision ID: 0017
+Revises: 0016
+Create Date: 2026-10-18
+"""
+
+import math
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0017'
+down_revision = '0016'
+branch_labels = None
+depends_on = None
+
+# must match app/services/geo.py (GRID_DEG, GRID_LNG_BITS)
+GRID_DEG = 0.02
+GRID_LNG_BITS = 16
+BATCH = 5000
+
+
+def _cell(lat: float, lng: float) -> int:
+    lat_idx = int(math.floor((min(max(lat, -90.0), 90.0) + 90.0) / GRID_DEG))
+    lng_idx = int(math.floor((min(max(lng, -180.0), 180.0) + 180.0) / GRID_DEG))
+    return (lat_idx << GRID_LNG_BITS) | lng_idx
+
+
+def upgrade() -> None:
+    op.add_column('route_points', sa.Column('cell', sa.BigInteger(), nullable=True))
+    # computed in Python (not SQL FLOOR) so keys match the app's float rounding exactly
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.text("SELECT id, lat, lng FROM route_points WHERE id > :last ORDER BY id LIMIT :n"),
+            {'last': last_id, 'n': BATCH},
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            sa.text("UPDATE route_points SET cell = :cell WHERE id = :id"),
+            [{'id': r.id, 'cell': _cell(r.lat, r.lng)} for r in rows],
+        )
+        last_id = rows[-1].id
+    op.create_index('ix_route_points_cell', 'route_points', ['cell', 'route_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_route_points_cell', table_name='route_points')
+    op.drop_column('route_points', 'cell')
@@ -0,0 +1,131 @@
+"""route_signatures + route_lsh_bands near-duplicate index
+
+Revision ID: 0018
+Revises: 0017
+Create Date: 2026-10-18
+"""
+
+import hashlib
+from itertools import groupby
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0018'
+down_revision = '0017'
+branch_labels = None
+depends_on = None
+
+BATCH = 2000
+
+# Frozen copy of app/services/similarity.py as of this revision, so the backfill
+# never changes with the app code. Stored signatures must match what the app computes.
+GRID_DEG = 0.02
+GRID_LNG_BITS = 16
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SAMPLE_KM = 0.5
+MAX_SAMPLES = 5000
+_PRIME = (1 << 31) - 1
+_KM_PER_DEG = 111.195
+
+
+def _coefficients() -> tuple[np.ndarray, np.ndarray]:
+    a, b = [], []
+    for i in range(NUM_PERM):
+        d = hashlib.blake2b(b"route-minhash:%d" % i, digest_size=8).digest()
+        a.append(int.from_bytes(d[:4], 'little') % (_PRIME - 1) + 1)
+        b.append(int.from_bytes(d[4:], 'little') % _PRIME)
+    return np.array(a, dtype=np.int64), np.array(b, dtype=np.int64)
+
+
+def _shingles(coords: list[tuple[float, float]]) -> np.ndarray:
+    if not coords:
+        return np.empty(0, dtype=np.int64)
+    pts = np.asarray(coords, dtype=np.float64)
+    if len(pts) > 1:
+        seg = np.diff(pts, axis=0)
+        seg_km = np.hypot(seg[:, 0], seg[:, 1] * np.cos(np.radians(pts[:-1, 0]))) * _KM_PER_DEG
+        steps = np.clip(np.ceil(seg_km / SAMPLE_KM).astype(np.int64), 1, None)
+        if steps.sum() > MAX_SAMPLES:
+            steps = np.maximum(1, steps * MAX_SAMPLES // steps.sum())
+        t = np.concatenate([np.arange(n) / n for n in steps])
+        starts = np.repeat(pts[:-1], steps, axis=0)
+        pts = np.vstack([starts + np.repeat(seg, steps, axis=0) * t[:, None], pts[-1:]])
+    lat_idx = np.floor((np.clip(pts[:, 0], -90.0, 90.0) + 90.0) / GRID_DEG).astype(np.int64)
+    lng_idx = np.floor((np.clip(pts[:, 1], -180.0, 180.0) + 180.0) / GRID_DEG).astype(np.int64)
+    return np.unique((lat_idx << GRID_LNG_BITS) | lng_idx)
+
+
+def minhash_signature(coords: list[tuple[float, float]], coef: tuple[np.ndarray, np.ndarray]) -> np.ndarray | None:
+    shingles = _shingles(coords)
+    if not len(shingles):
+        return None
+    a, b = coef
+    x = shingles % _PRIME
+    return ((a[:, None] * x[None, :] + b[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def band_buckets(signature: np.ndarray) -> list[int]:
+    rows = signature.astype('<u4').reshape(BANDS, ROWS)
+    return [
+        int.from_bytes(hashlib.blake2b(row.tobytes(), digest_size=8).digest(), 'little', signed=True)
+        for row in rows
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'route_signatures',
+        sa.Column('route_id', sa.Integer(), sa.ForeignKey('routes.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('signature', sa.LargeBinary(), nullable=False),
+    )
+    op.create_table(
+        'route_lsh_bands',
+        sa.Column('band', sa.SmallInteger(), primary_key=True),
+        sa.Column('bucket', sa.BigInteger(), primary_key=True),
+        sa.Column('route_id', sa.Integer(), sa.ForeignKey('routes.id', ondelete='CASCADE'), primary_key=True),
+    )
+    op.create_index('ix_route_lsh_bands_route_id', 'route_lsh_bands', ['route_id'])
+
+    # backfill from route_points, a batch of routes at a time
+    conn = op.get_bind()
+    coef = _coefficients()
+    last_id = 0
+    while True:
+        ids = [r[0] for r in conn.execute(
+            sa.text("SELECT id FROM routes WHERE id > :last ORDER BY id LIMIT :n"), {'last': last_id, 'n': BATCH}
+        )]
+        if not ids:
+            break
+        rows = conn.execute(
+            sa.text(
+                "SELECT route_id, lat, lng FROM route_points "
+                "WHERE route_id >= :lo AND route_id <= :hi ORDER BY route_id, seq"
+            ),
+            {'lo': ids[0], 'hi': ids[-1]},
+        ).all()
+        signatures, bands = [], []
+        for route_id, points in groupby(rows, key=lambda r: r.route_id):
+            signature = minhash_signature([(p.lat, p.lng) for p in points], coef)
+            if signature is None:
+                continue
+            signatures.append({'route_id': route_id, 'signature': signature.astype('<u4').tobytes()})
+            bands.extend(
+                {'band': band, 'bucket': bucket, 'route_id': route_id}
+                for band, bucket in enumerate(band_buckets(signature))
+            )
+        if signatures:
+            conn.execute(sa.text("INSERT INTO route_signatures (route_id, signature) VALUES (:route_id, :signature)"), signatures)
+            conn.execute(sa.text("INSERT INTO route_lsh_bands (band, bucket, route_id) VALUES (:band, :bucket, :route_id)"), bands)
+        last_id = ids[-1]
+
+
+def downgrade() -> None:
+    op.drop_index('ix_route_lsh_bands_route_id', table_name='route_lsh_bands')
+    op.drop_table('route_lsh_bands')
+    op.drop_table('route_signatures')
@@ -0,0 +1,64 @@
+"""packed routes.geometry (int32 fixed-point lat/lng pairs)
+
+Revision ID: 0019
+Revises: 0018
+Create Date: 2026-10-18
+"""
+
+from itertools import groupby
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = '0019'
+down_revision = '0018'
+branch_labels = None
+depends_on = None
+
+BATCH = 2000
+
+# Frozen copy of app/services/geometry.py as of this revision: little-endian int32
+# (lat, lng) pairs at 1e-7 degree per unit
+GEOMETRY_SCALE = 10_000_000
+
+
+def pack_geometry(coords: list[tuple[float, float]]) -> bytes | None:
+    if not coords:
+        return None
+    arr = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    return np.rint(arr * GEOMETRY_SCALE).astype('<i4').tobytes()
+
+
+def upgrade() -> None:
+    op.add_column('routes', sa.Column('geometry', sa.LargeBinary().with_variant(mysql.MEDIUMBLOB(), 'mysql'), nullable=True))
+    # pack existing route_points; the rows stay as the names + spatial index table
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        ids = [r[0] for r in conn.execute(
+            sa.text("SELECT id FROM routes WHERE id > :last ORDER BY id LIMIT :n"), {'last': last_id, 'n': BATCH}
+        )]
+        if not ids:
+            break
+        rows = conn.execute(
+            sa.text(
+                "SELECT route_id, lat, lng FROM route_points "
+                "WHERE route_id >= :lo AND route_id <= :hi ORDER BY route_id, seq"
+            ),
+            {'lo': ids[0], 'hi': ids[-1]},
+        ).all()
+        updates = [
+            {'id': route_id, 'geometry': pack_geometry([(p.lat, p.lng) for p in points])}
+            for route_id, points in groupby(rows, key=lambda r: r.route_id)
+        ]
+        if updates:
+            conn.execute(sa.text("UPDATE routes SET geometry = :geometry WHERE id = :id"), updates)
+        last_id = ids[-1]
+
+
+def downgrade() -> None:
+    op.drop_column('routes', 'geometry')
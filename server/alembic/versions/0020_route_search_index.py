@@ -0,0 +1,113 @@
+"""route_search_docs + route_search_postings bigram search index
+
+Revision ID: 0020
+Revises: 0019
+Create Date: 2026-10-18
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from itertools import groupby
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = '0020'
+down_revision = '0019'
+branch_labels = None
+depends_on = None
+
+BATCH = 1000
+
+# Frozen copy of the tokenizer in app/services/search.py as of this revision, so the
+# backfilled postings never change with the app code
+TERM_MAX_LEN = 32
+FIELD_WEIGHTS = {'title': 3, 'region': 2, 'names': 2, 'summary': 1}
+_RUN_RE = re.compile(r"\w+")
+
+
+def _tokenize(text: str | None) -> list[str]:
+    if not text:
+        return []
+    terms: list[str] = []
+    for run in _RUN_RE.findall(unicodedata.normalize('NFKC', text).lower()):
+        run = run.replace('_', '')
+        if len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def route_terms(title, summary, region1, region2, names) -> Counter:
+    tf: Counter = Counter()
+    fields = {'title': [title], 'summary': [summary], 'region': [region1, region2], 'names': list(names)}
+    for field, texts in fields.items():
+        for text in texts:
+            for term in _tokenize(text):
+                tf[term[:TERM_MAX_LEN]] += FIELD_WEIGHTS[field]
+    return tf
+
+
+def upgrade() -> None:
+    op.create_table(
+        'route_search_docs',
+        sa.Column('route_id', sa.Integer(), sa.ForeignKey('routes.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('length', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.create_table(
+        'route_search_postings',
+        # utf8mb4_bin: the default MySQL collation folds accents/width ('fé' = 'fe', 'ß' = 'ss')
+        sa.Column('term', sa.String(length=32).with_variant(mysql.VARCHAR(32, collation='utf8mb4_bin'), 'mysql'), primary_key=True),
+        sa.Column('route_id', sa.Integer(), sa.ForeignKey('routes.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('tf', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.create_index('ix_route_search_postings_route_id', 'route_search_postings', ['route_id'])
+
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        routes = conn.execute(
+            sa.text(
+                "SELECT id, title, summary, region1, region2 FROM routes "
+                "WHERE id > :last ORDER BY id LIMIT :n"
+            ),
+            {'last': last_id, 'n': BATCH},
+        ).all()
+        if not routes:
+            break
+        names = {
+            route_id: [p.name for p in points]
+            for route_id, points in groupby(
+                conn.execute(
+                    sa.text(
+                        "SELECT route_id, name FROM route_points "
+                        "WHERE route_id >= :lo AND route_id <= :hi ORDER BY route_id, seq"
+                    ),
+                    {'lo': routes[0].id, 'hi': routes[-1].id},
+                ).all(),
+                key=lambda r: r.route_id,
+            )
+        }
+        docs, postings = [], []
+        for r in routes:
+            tf = route_terms(r.title, r.summary, r.region1, r.region2, names.get(r.id, []))
+            docs.append({'route_id': r.id, 'length': sum(tf.values())})
+            postings.extend({'term': term, 'route_id': r.id, 'tf': count} for term, count in tf.items())
+        conn.execute(sa.text("INSERT INTO route_search_docs (route_id, length) VALUES (:route_id, :length)"), docs)
+        if postings:
+            conn.execute(
+                sa.text("INSERT INTO route_search_postings (term, route_id, tf) VALUES (:term, :route_id, :tf)"),
+                postings,
+            )
+        last_id = routes[-1].id
+
+
+def downgrade() -> None:
+    op.drop_index('ix_route_search_postings_route_id', table_name='route_search_postings')
+    op.drop_table('route_search_postings')
+    op.drop_table('route_search_docs')
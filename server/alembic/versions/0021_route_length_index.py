@@ -0,0 +1,81 @@
+"""server-computed routes.length_km, indexed
+
+Revision ID: 0021
+Revises: 0020
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0021'
+down_revision = '0020'
+branch_labels = None
+depends_on = None
+
+BATCH = 2000
+# settings.route_avg_speed_kmh default at this revision
+AVG_SPEED_KMH = 45.0
+
+# Frozen copies of app/services/geometry.unpack_geometry and app/services/geo
+# as of this revision, so the backfill never changes with the app code
+GEOMETRY_SCALE = 10_000_000
+EARTH_RADIUS_KM = 6371.0088
+
+
+def unpack_geometry(blob: bytes | None) -> np.ndarray:
+    if not blob:
+        return np.empty((0, 2))
+    return np.frombuffer(blob, dtype='<i4').reshape(-1, 2) / GEOMETRY_SCALE
+
+
+def path_length_km(pts: np.ndarray) -> float:
+    if len(pts) < 2:
+        return 0.0
+    phi = np.radians(pts[:, 0])
+    dphi = np.diff(phi)
+    dlmb = np.radians(np.diff(pts[:, 1]))
+    a = np.sin(dphi / 2.0) ** 2 + np.cos(phi[:-1]) * np.cos(phi[1:]) * np.sin(dlmb / 2.0) ** 2
+    return float((2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))).sum())
+
+
+def upgrade() -> None:
+    # recompute length from the packed geometry; keep client durations, estimate missing ones
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.text(
+                "SELECT id, geometry, duration_min FROM routes "
+                "WHERE id > :last AND geometry IS NOT NULL ORDER BY id LIMIT :n"
+            ),
+            {'last': last_id, 'n': BATCH},
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for r in rows:
+            coords = unpack_geometry(r.geometry)
+            if len(coords) < 2:
+                continue
+            length_km = round(path_length_km(coords), 3)
+            duration_min = r.duration_min
+            if duration_min is None:
+                duration_min = round(length_km / AVG_SPEED_KMH * 60)
+            updates.append({'id': r.id, 'length_km': length_km, 'duration_min': duration_min})
+        if updates:
+            conn.execute(
+                sa.text("UPDATE routes SET length_km = :length_km, duration_min = :duration_min WHERE id = :id"),
+                updates,
+            )
+        last_id = rows[-1].id
+    op.create_index('ix_routes_region1_length_km', 'routes', ['region1', 'length_km'])
+    op.create_index('ix_routes_length_km', 'routes', ['length_km'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_routes_length_km', table_name='routes')
+    op.drop_index('ix_routes_region1_length_km', table_name='routes')
@@ -0,0 +1,88 @@
+"""routes.curviness (heading change per km), indexed
+
+Revision ID: 0022
+Revises: 0021
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0022'
+down_revision = '0021'
+branch_labels = None
+depends_on = None
+
+BATCH = 2000
+
+# Frozen copies of app/services/geometry.unpack_geometry and app/services/geo
+# as of this revision, so the backfill never changes with the app code
+GEOMETRY_SCALE = 10_000_000
+EARTH_RADIUS_KM = 6371.0088
+
+
+def unpack_geometry(blob: bytes | None) -> np.ndarray:
+    if not blob:
+        return np.empty((0, 2))
+    return np.frombuffer(blob, dtype='<i4').reshape(-1, 2) / GEOMETRY_SCALE
+
+
+def path_length_km(pts: np.ndarray) -> float:
+    if len(pts) < 2:
+        return 0.0
+    phi = np.radians(pts[:, 0])
+    dphi = np.diff(phi)
+    dlmb = np.radians(np.diff(pts[:, 1]))
+    a = np.sin(dphi / 2.0) ** 2 + np.cos(phi[:-1]) * np.cos(phi[1:]) * np.sin(dlmb / 2.0) ** 2
+    return float((2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))).sum())
+
+
+def curviness(pts: np.ndarray) -> float:
+    if len(pts) > 1:
+        pts = pts[np.concatenate([[True], np.any(np.diff(pts, axis=0) != 0, axis=1)])]
+    if len(pts) < 3:
+        return 0.0
+    length = path_length_km(pts)
+    if length <= 0:
+        return 0.0
+    phi = np.radians(pts[:, 0])
+    dlmb = np.radians(np.diff(pts[:, 1]))
+    bearing = np.degrees(np.arctan2(
+        np.sin(dlmb) * np.cos(phi[1:]),
+        np.cos(phi[:-1]) * np.sin(phi[1:]) - np.sin(phi[:-1]) * np.cos(phi[1:]) * np.cos(dlmb),
+    ))
+    turn = (np.diff(bearing) + 180.0) % 360.0 - 180.0
+    return float(np.abs(turn).sum() / length)
+
+
+def upgrade() -> None:
+    op.add_column('routes', sa.Column('curviness', sa.Float(), nullable=True))
+    # backfill from the packed geometry in id-ordered batches (one UPDATE round trip each)
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.text("SELECT id, geometry FROM routes WHERE id > :last AND geometry IS NOT NULL ORDER BY id LIMIT :n"),
+            {'last': last_id, 'n': BATCH},
+        ).all()
+        if not rows:
+            break
+        updates = [
+            {'id': r.id, 'curviness': round(curviness(coords), 3)}
+            for r in rows
+            if len(coords := unpack_geometry(r.geometry)) >= 2
+        ]
+        if updates:
+            conn.execute(sa.text("UPDATE routes SET curviness = :curviness WHERE id = :id"), updates)
+        last_id = rows[-1].id
+    op.create_index('ix_routes_region1_curviness', 'routes', ['region1', 'curviness'])
+    op.create_index('ix_routes_curviness', 'routes', ['curviness'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_routes_curviness', table_name='routes')
+    op.drop_index('ix_routes_region1_curviness', table_name='routes')
+    op.drop_column('routes', 'curviness')
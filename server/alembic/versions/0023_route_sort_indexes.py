@@ -0,0 +1,30 @@
+"""indexes for the latest / comments list sorts
+
+Revision ID: 0023
+Revises: 0022
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0023'
+down_revision = '0022'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # keyset pages of sort=latest / sort=comments range-scan these instead of filesorting
+    op.create_index('ix_routes_region1_created_at', 'routes', ['region1', 'created_at'])
+    op.create_index('ix_routes_created_at', 'routes', ['created_at'])
+    op.create_index('ix_routes_region1_comment_count', 'routes', ['region1', 'comment_count'])
+    op.create_index('ix_routes_comment_count', 'routes', ['comment_count'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_routes_comment_count', table_name='routes')
+    op.drop_index('ix_routes_region1_comment_count', table_name='routes')
+    op.drop_index('ix_routes_created_at', table_name='routes')
+    op.drop_index('ix_routes_region1_created_at', table_name='routes')
@@ -0,0 +1,26 @@
+"""clear routes.length_km / curviness on routes without a path
+
+Revision ID: 0024
+Revises: 0023
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0024'
+down_revision = '0023'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # length_km and curviness only ever come from the geometry (two or more 8-byte
+    # points); drop client-sent lengths and values left behind by cleared points
+    op.execute("UPDATE routes SET length_km = NULL, curviness = NULL WHERE geometry IS NULL OR LENGTH(geometry) < 16")
+
+
+def downgrade() -> None:
+    # the cleared values were not derived from anything stored
+    pass
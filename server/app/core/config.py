@@ -31,6 +31,42 @@ class Settings(BaseSettings):
         "http://localhost:3000",
     ]
 
+    # Seconds a GET /routes?include_total=true count stays cached per filter
+    route_count_cache_ttl_s: float = 60.0
+
+    # In-process response cache for GET /routes/{id} and first pages of GET /routes
+    response_cache_size: int = 4096
+    response_cache_ttl_s: float = 30.0
+    response_cache_stale_s: float = 120.0
+
+    # Average riding speed used to estimate duration_min from the computed length_km
+    route_avg_speed_kmh: float = 45.0
+
+    # Seconds the search index's document count / average length stay cached
+    search_stats_ttl_s: float = 60.0
+
+    # Estimated Jaccard (MinHash) at or above which routes count as near-duplicates
+    similar_route_threshold: float = 0.5
+
+    # Serve GET /routes, /routes/mine and /bookmarks/ through app/services/fastjson.py
+    # (orjson / pydantic-core) instead of FastAPI's response_model serialization
+    fast_json_responses: bool = False
+
+    # Parse-result cache entries (keyed by normalized link + parser version)
+    parse_cache_size: int = 50000
+
+    # naver.me shortlink expansion (shared async HTTP client)
+    shortlink_timeout_s: float = 3.0
+    shortlink_max_connections: int = 20
+    shortlink_max_concurrency: int = 10
+    shortlink_cache_size: int = 10000
+    shortlink_cache_ttl_s: float = 24 * 3600
+    shortlink_negative_ttl_s: float = 60.0
+    shortlink_db_ttl_s: float = 30 * 24 * 3600
+    shortlink_breaker_failures: int = 5
+    shortlink_breaker_slow_s: float = 1.5
+    shortlink_breaker_reset_s: float = 30.0
+
     @property
     def database_url(self) -> str:
         # 1) Use DATABASE_URL verbatim when provided
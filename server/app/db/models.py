@@ -2,7 +2,8 @@ from __future__ import annotations
 
 from datetime import datetime
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, DateTime, Text, Float, Enum, ForeignKey, BigInteger, UniqueConstraint
+from sqlalchemy.dialects import mysql
+from sqlalchemy import String, Integer, DateTime, Text, Float, Enum, ForeignKey, BigInteger, LargeBinary, SmallInteger, UniqueConstraint, Index
 import enum
 
 
@@ -25,6 +26,20 @@ class Traffic(enum.Enum):
 
 class Route(Base):
     __tablename__ = "routes"
+    __table_args__ = (
+        Index("ix_routes_region1_open_count", "region1", "open_count"),
+        Index("ix_routes_open_count", "open_count"),
+        Index("ix_routes_region1_popularity_score", "region1", "popularity_score"),
+        Index("ix_routes_popularity_score", "popularity_score"),
+        Index("ix_routes_region1_length_km", "region1", "length_km"),
+        Index("ix_routes_length_km", "length_km"),
+        Index("ix_routes_region1_curviness", "region1", "curviness"),
+        Index("ix_routes_curviness", "curviness"),
+        Index("ix_routes_region1_created_at", "region1", "created_at"),
+        Index("ix_routes_created_at", "created_at"),
+        Index("ix_routes_region1_comment_count", "region1", "comment_count"),
+        Index("ix_routes_comment_count", "comment_count"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     author_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
@@ -32,6 +47,7 @@ class Route(Base):
     summary: Mapped[str | None] = mapped_column(String(1000))
     region1: Mapped[str | None] = mapped_column(String(100))
     region2: Mapped[str | None] = mapped_column(String(100))
+    # Computed from the points on write (app/services/geo.path_length_km)
     length_km: Mapped[float | None] = mapped_column(Float)
     duration_min: Mapped[int | None] = mapped_column(Integer)
     stars_scenery: Mapped[int | None] = mapped_column(Integer)
@@ -46,29 +62,49 @@ class Route(Base):
     nmap_url: Mapped[str | None] = mapped_column(Text)
     like_count: Mapped[int] = mapped_column(Integer, default=0)
     comment_count: Mapped[int] = mapped_column(Integer, default=0)
+    # Denormalized COUNT(*) of route_open_events, bumped by /routes/{id}/open-track
+    open_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # like_count * 2 + comment_count, stored so sort=popular can read it off an index
+    popularity_score: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Bumped on every write that changes the route, its photos or its comment thread;
+    # ETags of route reads are derived from it
+    revision: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Denormalized COUNT(*) of route_photos, so list endpoints never touch the relationship
+    photo_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Absolute heading change in degrees per km, computed from the points on write
+    # (app/services/geo.curviness); NULL for routes without points
+    curviness: Mapped[float | None] = mapped_column(Float)
+    # Packed int32 fixed-point (lat, lng) pairs, see app/services/geometry.py. Deferred so
+    # route lists never fetch it; read it with select(Route.geometry). route_points keeps
+    # one row per point for names and the spatial cell index.
+    geometry: Mapped[bytes | None] = mapped_column(
+        LargeBinary().with_variant(mysql.MEDIUMBLOB(), "mysql"), deferred=True
+    )
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     points: Mapped[list[RoutePoint]] = relationship(back_populates="route", cascade="all, delete-orphan")
     photos: Mapped[list["RoutePhoto"]] = relationship(back_populates="route", cascade="all, delete-orphan")
 
+    def refresh_popularity_score(self) -> None:
+        # Call after changing like_count or comment_count
+        self.popularity_score = (self.like_count or 0) * 2 + (self.comment_count or 0)
+
+    def bump_revision(self) -> None:
+        # Call on every write that changes RouteOut, photos or comments of this route
+        self.revision = (self.revision or 0) + 1
+
     @property
     def has_photos(self) -> bool:
-        # IMPORTANT: Avoid triggering a lazy-load on the async relationship here.
-        # Accessing `self.photos` normally can perform IO during Pydantic serialization
-        # which raises `MissingGreenlet` under async sessions. We therefore check the
-        # instance dict directly. If not loaded, report False without loading.
-        state_dict = object.__getattribute__(self, "__dict__")
-        if "photos" not in state_dict:
-            return False
-        photos_value = state_dict.get("photos")
-        try:
-            return len(photos_value) > 0
-        except Exception:
-            return bool(photos_value)
+        # Read from the stored counter: touching `self.photos` here could lazy-load
+        # during Pydantic serialization, which raises `MissingGreenlet` under async sessions.
+        return (self.photo_count or 0) > 0
 
 
 class RoutePoint(Base):
     __tablename__ = "route_points"
+    __table_args__ = (
+        Index("ix_route_points_cell", "cell", "route_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     route_id: Mapped[int] = mapped_column(ForeignKey("routes.id", ondelete="CASCADE"))
@@ -77,10 +113,89 @@ class RoutePoint(Base):
     lng: Mapped[float] = mapped_column(Float)
     name: Mapped[str | None] = mapped_column(String(200))
     type: Mapped[str | None] = mapped_column(String(20))
+    # Spatial grid key of (lat, lng), see app/services/geo.grid_cell
+    cell: Mapped[int | None] = mapped_column(BigInteger)
 
     route: Mapped[Route] = relationship(back_populates="points")
 
 
+class RouteTag(Base):
+    """Inverted index of ``Route.tags_bitmask``: one row per set bit.
+
+    ``region1`` is copied from the route so tag + region filters resolve from
+    ``ix_route_tags_tag_bit_region1`` alone.
+    """
+    __tablename__ = "route_tags"
+    __table_args__ = (
+        Index("ix_route_tags_tag_bit_region1", "tag_bit", "region1", "route_id"),
+        Index("ix_route_tags_route_id", "route_id"),
+    )
+
+    tag_bit: Mapped[int] = mapped_column(Integer, primary_key=True)
+    route_id: Mapped[int] = mapped_column(ForeignKey("routes.id", ondelete="CASCADE"), primary_key=True)
+    region1: Mapped[str | None] = mapped_column(String(100))
+
+
+class RouteSignature(Base):
+    """MinHash signature of a route's geometry (``NUM_PERM`` little-endian uint32)."""
+    __tablename__ = "route_signatures"
+
+    route_id: Mapped[int] = mapped_column(ForeignKey("routes.id", ondelete="CASCADE"), primary_key=True)
+    signature: Mapped[bytes] = mapped_column(LargeBinary)
+
+
+class RouteLshBand(Base):
+    """LSH buckets of ``RouteSignature``: one row per band, so routes sharing any
+    ``(band, bucket)`` are near-duplicate candidates."""
+    __tablename__ = "route_lsh_bands"
+    __table_args__ = (
+        Index("ix_route_lsh_bands_route_id", "route_id"),
+    )
+
+    band: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    bucket: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    route_id: Mapped[int] = mapped_column(ForeignKey("routes.id", ondelete="CASCADE"), primary_key=True)
+
+
+class RouteSearchDoc(Base):
+    """Per-route document length (sum of weighted term frequencies) for BM25."""
+    __tablename__ = "route_search_docs"
+
+    route_id: Mapped[int] = mapped_column(ForeignKey("routes.id", ondelete="CASCADE"), primary_key=True)
+    length: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class RouteSearchPosting(Base):
+    """Inverted index for route search: one row per (term, route) with its weighted
+    term frequency. Terms are character bigrams, see app/services/search.py."""
+    __tablename__ = "route_search_postings"
+    __table_args__ = (
+        Index("ix_route_search_postings_route_id", "route_id"),
+    )
+
+    # binary collation on MySQL: terms are already NFKC-lowercased, and the default
+    # accent/width-insensitive collation would make e.g. 'fé'/'fe' one primary key
+    term: Mapped[str] = mapped_column(
+        String(32).with_variant(mysql.VARCHAR(32, collation="utf8mb4_bin"), "mysql"), primary_key=True
+    )
+    route_id: Mapped[int] = mapped_column(ForeignKey("routes.id", ondelete="CASCADE"), primary_key=True)
+    tf: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class RouteFacetCount(Base):
+    """Route counts per (region1, region2, tag bit) cell, maintained incrementally.
+
+    ``tag_bit = -1`` rows count all routes in the region cell regardless of tags;
+    missing regions are stored as ``''`` so every cell has a primary key.
+    """
+    __tablename__ = "route_facet_counts"
+
+    region1: Mapped[str] = mapped_column(String(100), primary_key=True)
+    region2: Mapped[str] = mapped_column(String(100), primary_key=True)
+    tag_bit: Mapped[int] = mapped_column(Integer, primary_key=True)
+    route_count: Mapped[int] = mapped_column(Integer, default=0)
+
+
 class Comment(Base):
     __tablename__ = "comments"
 
@@ -171,3 +286,11 @@ class Report(Base):
     detail: Mapped[str | None] = mapped_column(Text)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
+
+
+class ShortlinkExpansion(Base):
+    __tablename__ = "shortlink_expansions"
+
+    short_url: Mapped[str] = mapped_column(String(255), primary_key=True)
+    expanded_url: Mapped[str] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -1,12 +1,18 @@
 from __future__ import annotations
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.routers import routes
-from app.routers import comments, bookmarks, auth, reports
+from app.routers import comments, bookmarks, auth, reports, me
+from app.services.shortlinks import shortlink_expander
 import logging
 import os
 import sys
@@ -20,20 +26,42 @@ logging.basicConfig(
 )
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared pooled HTTP client for naver.me expansion lives as long as the app
+    await shortlink_expander.start()
+    try:
+        yield
+    finally:
+        await shortlink_expander.aclose()
+
+
+async def validation_error_handler(request: Request, exc: RequestValidationError) -> JSONResponse:
+    try:
+        return await request_validation_exception_handler(request, exc)
+    except ValueError:
+        # NaN/Infinity in a JSON body can't be echoed back: answer the 422 without inputs
+        errors = [{k: v for k, v in err.items() if k != "input"} for err in exc.errors()]
+        return JSONResponse(status_code=422, content={"detail": jsonable_encoder(errors)})
+
+
 def get_application() -> FastAPI:
-    app = FastAPI(title=settings.app_name)
+    app = FastAPI(title=settings.app_name, lifespan=lifespan)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.cors_origins,
         allow_credentials=True,
         allow_methods=["*"],
-        allow_headers=["*"]
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag", "X-Geometry-Scale"],
     )
+    app.add_exception_handler(RequestValidationError, validation_error_handler)
     app.include_router(routes.router, prefix=settings.api_prefix)
     app.include_router(comments.router, prefix=settings.api_prefix)
     app.include_router(bookmarks.router, prefix=settings.api_prefix)
     app.include_router(auth.router, prefix=settings.api_prefix)
     app.include_router(reports.router, prefix=settings.api_prefix)
+    app.include_router(me.router, prefix=settings.api_prefix)
     # Serve uploaded files for local/dev
     upload_dir = Path("uploads")
     upload_dir.mkdir(parents=True, exist_ok=True)
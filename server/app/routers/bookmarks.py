@@ -7,6 +7,9 @@ from app.db.session import get_db
 from app.db.models import Bookmark, Route, User
 from app.schemas import RouteOut
 from app.core.auth import get_current_user
+from app.core.config import settings
+from app.services.fastjson import route_list_response
+from app.services.viewer_state import viewer_states
 
 router = APIRouter(prefix="/bookmarks", tags=["bookmarks"])
 
@@ -39,11 +42,16 @@ async def remove_bookmark(route_id: int, db: AsyncSession = Depends(get_db), use
 
 
 @router.get("/", response_model=list[RouteOut])
-async def list_bookmarked_routes(db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
+async def list_bookmarked_routes(with_state: bool = False, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
     stmt = select(Route).join(Bookmark, (Bookmark.route_id == Route.id) & (Bookmark.user_id == user.id)).order_by(Bookmark.created_at.desc())
     res = await db.execute(stmt)
     routes = list(res.scalars().all())
-    return [RouteOut.model_validate(r) for r in routes]
+    if with_state:
+        states = await viewer_states(db, user.id, (r.id for r in routes))
+        routes = [RouteOut.model_validate(r).model_copy(update={'viewer_state': states[r.id]}) for r in routes]
+    if settings.fast_json_responses:
+        return route_list_response(routes)
+    return routes
 
 
 @router.get("/route/{route_id}")
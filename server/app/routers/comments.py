@@ -1,12 +1,15 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, update
 from app.db.session import get_db
 from app.db.models import Comment, Route, User, CommentLike
 from app.schemas import CommentCreate, CommentOut
 from app.core.auth import get_current_user, get_optional_user
+from app.services.comments import comment_page
+from app.services.etag import etag_matches, not_modified, route_etag
+from app.services.route_cache import evict_route
 
 router = APIRouter(prefix="/comments", tags=["comments"])
 
@@ -14,54 +17,23 @@ router = APIRouter(prefix="/comments", tags=["comments"])
 @router.get("/route/{route_id}", response_model=list[CommentOut])
 async def list_comments(
     route_id: int,
+    request: Request,
+    response: Response,
     sort: str | None = None,
     db: AsyncSession = Depends(get_db),
     user: User | None = Depends(get_optional_user),
 ):
     sort_mode = (sort or "recent").lower()
 
-    res = await db.execute(select(Comment).where(Comment.route_id == route_id))
-    comments = list(res.scalars().all())
-    if not comments:
-        return []
+    revision = await db.scalar(select(Route.revision).where(Route.id == route_id))
+    if revision is not None:
+        # liked_by_me differs per viewer, so the viewer is part of the tag
+        etag = route_etag("comments", route_id, revision, user.id if user else 0)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
 
-    ids = [c.id for c in comments]
-
-    # Fetch like counts
-    cnt_res = await db.execute(
-        select(CommentLike.comment_id, func.count().label("cnt"))
-        .where(CommentLike.comment_id.in_(ids))
-        .group_by(CommentLike.comment_id)
-    )
-    id_to_count = {cid: int(cnt) for cid, cnt in cnt_res.all()}
-
-    # Fetch liked-by-me set
-    liked_set: set[int] = set()
-    if user:
-        liked_res = await db.execute(
-            select(CommentLike.comment_id)
-            .where(CommentLike.user_id == user.id, CommentLike.comment_id.in_(ids))
-        )
-        liked_set = {row[0] for row in liked_res.all()}
-
-    # Sort
-    if sort_mode == "likes":
-        comments.sort(key=lambda c: (-(id_to_count.get(c.id, 0)), -int(c.created_at.timestamp() if hasattr(c.created_at, 'timestamp') else 0)))
-    else:
-        comments.sort(key=lambda c: -int(c.created_at.timestamp() if hasattr(c.created_at, 'timestamp') else 0))
-
-    # Build payloads
-    out: list[CommentOut] = []
-    for c in comments:
-        out.append(CommentOut(
-            id=c.id,
-            route_id=c.route_id,
-            content=c.content,
-            created_at=c.created_at,
-            like_count=id_to_count.get(c.id, 0),
-            liked_by_me=(c.id in liked_set),
-        ))
-    return out
+    return await comment_page(db, route_id, sort_mode, user)
 
 
 @router.post("/route/{route_id}", response_model=CommentOut)
@@ -73,7 +45,10 @@ async def add_comment(route_id: int, payload: CommentCreate, db: AsyncSession =
     db.add(c)
     await db.flush()
     route.comment_count = (route.comment_count or 0) + 1
+    route.refresh_popularity_score()
+    route.bump_revision()
     await db.commit()
+    evict_route(route_id, sorts=('popular', 'comments'))
     await db.refresh(c)
     return CommentOut(
         id=c.id,
@@ -85,6 +60,12 @@ async def add_comment(route_id: int, payload: CommentCreate, db: AsyncSession =
     )
 
 
+async def _bump_thread_revision(db: AsyncSession, comment_id: int) -> None:
+    # comment like counts are part of GET /comments/route/{id}, whose ETag follows Route.revision
+    route_id = select(Comment.route_id).where(Comment.id == comment_id).scalar_subquery()
+    await db.execute(update(Route).where(Route.id == route_id).values(revision=Route.revision + 1))
+
+
 @router.get("/{comment_id}/liked")
 async def check_comment_liked(comment_id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
     res = await db.execute(select(CommentLike).where(CommentLike.comment_id == comment_id, CommentLike.user_id == user.id).limit(1))
@@ -97,6 +78,7 @@ async def like_comment(comment_id: int, db: AsyncSession = Depends(get_db), user
     if existing.scalar_one_or_none():
         return {"ok": True}
     db.add(CommentLike(comment_id=comment_id, user_id=user.id))
+    await _bump_thread_revision(db, comment_id)
     await db.commit()
     return {"ok": True}
 
@@ -107,6 +89,7 @@ async def unlike_comment(comment_id: int, db: AsyncSession = Depends(get_db), us
     row = res.scalar_one_or_none()
     if row:
         await db.delete(row)
+        await _bump_thread_revision(db, comment_id)
         await db.commit()
     return {"ok": True}
 
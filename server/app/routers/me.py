@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_db
+from app.db.models import User
+from app.schemas import RouteStateIn, RouteViewerState
+from app.core.auth import get_current_user
+from app.services.viewer_state import viewer_states
+
+router = APIRouter(prefix="/me", tags=["me"])
+
+
+@router.post("/route-state", response_model=list[RouteViewerState])
+async def route_state(payload: RouteStateIn, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
+    states = await viewer_states(db, user.id, payload.route_ids)
+    return list(states.values())
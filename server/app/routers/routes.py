@@ -1,15 +1,36 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Body, Form, Request, UploadFile, File
+import asyncio
+from typing import Literal
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Body, Form, Query, Request, Response, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import and_, exists, func, or_, select, update
+from app.core.config import settings
 from app.db.session import get_db
-from app.schemas import RouteNormalized, RouteCreate, RouteOut, RouteUpdate
-from app.services.parser import parse_naver_route, ParseError
-from app.db.models import Route, RoutePoint, RouteOpenEvent, Like, RoutePhoto
-from pydantic import BaseModel
+from app.schemas import RouteNormalized, RouteCreate, RouteCard, RouteOut, RouteUpdate, ParseBatchIn, ParseBatchItem, ParseBatchOut, RouteFacetsOut, MapMarkerOut, RouteBBoxOut, RouteFullOut, RouteNearbyOut, RouteGeometryOut, RoutePhotoOut, RouteSearchOut, RouteSimilarIn, SimilarRouteOut, Waypoint
+from app.services.parser import parse_cache_stats, resolve_naver_route, shortlink_of, ParseError
+from app.services.shortlinks import shortlink_expander
+from app.services.fastjson import json_response, route_list_response
+from app.services.geo import curviness, path_length_km
+from app.services.geometry import GEOMETRY_SCALE, pack_geometry, unpack_geometry
+from app.services.search import index_route_text, search_routes
+from app.services.similarity import index_route_geometry, minhash_signature, similar_routes
+from app.services.spatial import NEARBY_MAX_RADIUS_KM, cluster_markers, nearby_routes, replace_route_points, route_markers
+from app.services.viewer_state import viewer_states
+from app.services.cache import LRUCache, MISSING
+from app.services.comments import comment_page
+from app.services.etag import etag_matches, not_modified, page_etag, route_etag
+from app.services.pagination import CursorError, decode_cursor, encode_cursor
+from app.services.route_cache import evict_region_lists, evict_route, list_page_tags, response_cache, route_tag
+from app.services.route_index import ALL_TAGS, apply_facet_delta, facet_snapshot, sync_route_tags, tag_bits
+from app.db.models import Route, RoutePoint, RouteOpenEvent, Like, RoutePhoto, RouteTag, RouteFacetCount, Bookmark, RouteSignature
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from app.core.auth import get_current_user, get_optional_user
 from app.db.models import User
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/routes", tags=["routes"])
 
@@ -18,27 +39,32 @@ class ParseBody(BaseModel):
     raw: str
 
 
-@router.post("/parse", response_model=RouteNormalized)
-async def parse_route(request: Request, body: ParseBody | None = Body(None), raw: str | None = Form(None)):
+async def _read_raw(request: Request, body: ParseBody | None, raw: str | None) -> str:
+    content_type = request.headers.get('content-type', '')
+    raw_value = ''
+    if 'application/json' in content_type:
+        try:
+            data = await request.json()
+            raw_value = (data or {}).get('raw') or ''
+        except Exception:
+            raw_value = ''
+    if not raw_value and ('application/x-www-form-urlencoded' in content_type or 'multipart/form-data' in content_type):
+        try:
+            form = await request.form()
+            raw_value = (form.get('raw') or '') if form else ''
+        except Exception:
+            raw_value = ''
+    if not raw_value:
+        raw_value = body.raw if body and getattr(body, 'raw', None) else (raw or '')
+    return raw_value
+
+
+_waypoint_list = TypeAdapter(list[Waypoint])
+
+
+def _to_normalized(result: dict) -> RouteNormalized:
+    # small normalization for Pydantic model naming alignment
     try:
-        content_type = request.headers.get('content-type', '')
-        raw_value = ''
-        if 'application/json' in content_type:
-            try:
-                data = await request.json()
-                raw_value = (data or {}).get('raw') or ''
-            except Exception:
-                raw_value = ''
-        if not raw_value and ('application/x-www-form-urlencoded' in content_type or 'multipart/form-data' in content_type):
-            try:
-                form = await request.form()
-                raw_value = (form.get('raw') or '') if form else ''
-            except Exception:
-                raw_value = ''
-        if not raw_value:
-            raw_value = body.raw if body and getattr(body, 'raw', None) else (raw or '')
-        result = parse_naver_route(raw_value)
-        # small normalization for Pydantic model naming alignment
         return RouteNormalized(
             modality=result['modality'],
             start=result.get('start'),
@@ -48,24 +74,30 @@ async def parse_route(request: Request, body: ParseBody | None = Body(None), raw
             nmapUrl=result.get('nmapUrl'),
             meta=result.get('meta', {}),
         )
+    except ValidationError:
+        # e.g. a link carrying out-of-range coordinates
+        raise ParseError('좌표가 올바르지 않아요.')
+
+
+@router.post("/parse", response_model=RouteNormalized)
+async def parse_route(
+    request: Request,
+    body: ParseBody | None = Body(None),
+    raw: str | None = Form(None),
+    db: AsyncSession = Depends(get_db),
+):
+    raw_value = await _read_raw(request, body, raw)
+    try:
+        short = shortlink_of(raw_value)
+        if short:
+            await shortlink_expander.load_persisted(db, [short])
+        result = await resolve_naver_route(raw_value)
+        if short:
+            await shortlink_expander.persist(db, [short])
+        return _to_normalized(result)
     except ParseError as e:
         # Best-effort fallback: still return an object so UI can "open original"
-        content_type = request.headers.get('content-type', '')
-        fallback_raw = ''
-        if 'application/json' in content_type:
-            try:
-                data = await request.json()
-                fallback_raw = (data or {}).get('raw') or ''
-            except Exception:
-                fallback_raw = ''
-        if not fallback_raw and ('application/x-www-form-urlencoded' in content_type or 'multipart/form-data' in content_type):
-            try:
-                form = await request.form()
-                fallback_raw = (form.get('raw') or '') if form else ''
-            except Exception:
-                fallback_raw = ''
-        if not fallback_raw:
-            fallback_raw = (body.raw if body and getattr(body, 'raw', None) else (raw or '')).strip()
+        fallback_raw = raw_value.strip()
         return RouteNormalized(
             modality='car',
             start=None,
@@ -77,6 +109,58 @@ async def parse_route(request: Request, body: ParseBody | None = Body(None), raw
         )
 
 
+@router.post("/parse/batch", response_model=ParseBatchOut)
+async def parse_routes_batch(payload: ParseBatchIn, db: AsyncSession = Depends(get_db)):
+    async def _parse_one(index: int, raw_value: str) -> ParseBatchItem:
+        try:
+            route = _to_normalized(await resolve_naver_route(raw_value))
+            return ParseBatchItem(index=index, ok=True, route=route)
+        except ParseError as e:
+            return ParseBatchItem(index=index, ok=False, error=str(e))
+        except Exception:
+            # one malformed link must not fail the whole batch
+            logger.exception("parse batch item %d failed", index)
+            return ParseBatchItem(index=index, ok=False, error='링크를 처리하지 못했어요.')
+
+    # The session is only touched before and after the concurrent section:
+    # shortlink expansions overlap there and the expander bounds upstream concurrency.
+    shorts = [s for s in (shortlink_of(r) for r in payload.raws) if s]
+    if shorts:
+        await shortlink_expander.load_persisted(db, shorts)
+    items = list(await asyncio.gather(*(_parse_one(i, r) for i, r in enumerate(payload.raws))))
+    if shorts:
+        await shortlink_expander.persist(db, shorts)
+    ok_count = sum(1 for item in items if item.ok)
+    return ParseBatchOut(items=items, ok_count=ok_count, error_count=len(items) - ok_count)
+
+
+async def _write_points(db: AsyncSession, route: Route, points) -> list[int]:
+    """Store a route's points: packed ``Route.geometry`` plus the ``route_points`` rows and
+    similarity index rows derived from it.
+
+    ``length_km`` and ``curviness`` are recomputed from the points (``None`` below two points).
+    ``duration_min`` is only estimated from the length while the route has none: a stored
+    (client-set) duration is never overwritten or cleared here.
+
+    Returns ids of existing near-duplicate routes so create/update can warn about them.
+    """
+    coords = await replace_route_points(db, route.id, points)
+    latlngs = [(lat, lng) for lat, lng, _ in coords]
+    route.geometry = pack_geometry(latlngs)
+    if len(latlngs) >= 2:
+        route.length_km = round(path_length_km(latlngs), 3)
+        route.curviness = round(curviness(latlngs), 3)
+        if route.duration_min is None:
+            route.duration_min = round(route.length_km / settings.route_avg_speed_kmh * 60)
+    else:
+        # no path left: drop the values derived from the old one
+        route.length_km = None
+        route.curviness = None
+    signature = await index_route_geometry(db, route.id, latlngs)
+    hits = await similar_routes(db, signature, exclude=route.id, threshold=settings.similar_route_threshold)
+    return [similar_id for similar_id, _ in hits]
+
+
 @router.post("", response_model=RouteOut)
 @router.post("/", response_model=RouteOut)
 async def create_route(payload: RouteCreate, db: AsyncSession = Depends(get_db), user: User | None = Depends(get_optional_user)):
@@ -85,7 +169,7 @@ async def create_route(payload: RouteCreate, db: AsyncSession = Depends(get_db),
         summary=payload.summary,
         region1=payload.region1,
         region2=payload.region2,
-        length_km=payload.length_km,
+        # length_km is never taken from the client; _write_points computes it
         duration_min=payload.duration_min,
         stars_scenery=payload.stars_scenery,
         stars_difficulty=payload.stars_difficulty,
@@ -101,14 +185,18 @@ async def create_route(payload: RouteCreate, db: AsyncSession = Depends(get_db),
     )
     db.add(new_route)
     await db.flush()
+    await sync_route_tags(db, new_route)
+    await apply_facet_delta(db, None, facet_snapshot(new_route))
 
+    similar_ids = None
     if payload.points:
-        for index, p in enumerate(payload.points):
-            db.add(RoutePoint(route_id=new_route.id, seq=index, lat=p.lat, lng=p.lng, name=p.name, type=None))
+        similar_ids = await _write_points(db, new_route, payload.points)
+    await index_route_text(db, new_route, [p.name for p in payload.points or []])
 
     await db.commit()
+    evict_region_lists(new_route.region1)
     await db.refresh(new_route)
-    return new_route
+    return RouteOut.model_validate(new_route).model_copy(update={'similar_route_ids': similar_ids})
 
 
 @router.post("/with-photos", response_model=RouteOut)
@@ -131,6 +219,14 @@ async def create_route_with_photos(
     photos: list[UploadFile] = File(default_factory=list),
     user: User | None = Depends(get_optional_user),
 ):
+    # Parse points JSON if provided; same rules as RouteCreate.points
+    parsed: list[Waypoint] = []
+    if points:
+        try:
+            parsed = _waypoint_list.validate_json(points)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False, include_input=False))
+
     # Create route from form fields
     new_route = Route(
         title=title,
@@ -149,27 +245,20 @@ async def create_route_with_photos(
     )
     db.add(new_route)
     await db.flush()
+    await sync_route_tags(db, new_route)
+    await apply_facet_delta(db, None, facet_snapshot(new_route))
 
-    # Parse points JSON if provided
-    if points:
-        try:
-            import json
-            arr = json.loads(points)
-            if isinstance(arr, list):
-                for index, p in enumerate(arr):
-                    lat = float(p.get('lat'))
-                    lng = float(p.get('lng'))
-                    name = p.get('name')
-                    db.add(RoutePoint(route_id=new_route.id, seq=index, lat=lat, lng=lng, name=name, type=None))
-        except Exception:
-            pass
+    similar_ids = None
+    if parsed:
+        similar_ids = await _write_points(db, new_route, parsed)
+    await index_route_text(db, new_route)
 
     # Store uploaded files to a local uploads/ directory and record URLs
     import os
     from pathlib import Path
     upload_dir = Path(os.getenv('UPLOAD_DIR', 'uploads'))
     upload_dir.mkdir(parents=True, exist_ok=True)
-    saved_any = False
+    saved = 0
     for f in photos or []:
         try:
             # generate safe filename
@@ -183,65 +272,418 @@ async def create_route_with_photos(
                 out.write(content)
             url = f"/uploads/{dest.name}"
             db.add(RoutePhoto(route_id=new_route.id, url=url, author_id=(user.id if user else None)))
-            saved_any = True
+            saved += 1
         except Exception:
             continue
+    new_route.photo_count = saved
 
     await db.commit()
+    evict_region_lists(new_route.region1)
     await db.refresh(new_route)
-    return new_route
+    return RouteOut.model_validate(new_route).model_copy(update={'similar_route_ids': similar_ids})
+
+
+# Total counts are cached briefly per filter so clients can show "N routes"
+# without a COUNT(*) per page.
+_total_cache = LRUCache(1024, ttl=settings.route_count_cache_ttl_s)
 
+SORT_MODES = ('latest', 'popular', 'comments', 'opens', 'length', 'curvy')
 
-@router.get("", response_model=list[RouteOut])
-@router.get("/", response_model=list[RouteOut])
-async def list_routes(region1: str | None = None, tag: int | None = None, sort: str | None = None, db: AsyncSession = Depends(get_db)):
-    stmt = select(Route)
+
+def _route_filters(
+    region1: str | None,
+    tag: int | None,
+    tag_mode: str = 'any',
+    min_km: float | None = None,
+    max_km: float | None = None,
+    min_curviness: float | None = None,
+) -> list:
+    filters = []
     if region1:
-        stmt = stmt.where(Route.region1 == region1)
+        filters.append(Route.region1 == region1)
+    # server-computed length, ranged on ix_routes_region1_length_km / ix_routes_length_km
+    if min_km is not None:
+        filters.append(Route.length_km >= min_km)
+    if max_km is not None:
+        filters.append(Route.length_km <= max_km)
+    if min_curviness is not None:
+        filters.append(Route.curviness >= min_curviness)
     if tag is not None:
-        # simple bitmask check
-        from sqlalchemy import literal
-        stmt = stmt.where((Route.tags_bitmask.op('&')(literal(tag))) != 0)
-
-    if sort == 'popular':
-        from sqlalchemy import desc
-        stmt = stmt.order_by(desc(Route.like_count * 2 + Route.comment_count))
-    elif sort == 'comments':
-        stmt = stmt.order_by(Route.comment_count.desc())
-    elif sort == 'latest':
-        stmt = stmt.order_by(Route.created_at.desc())
-    elif sort == 'opens':
-        from sqlalchemy import func, outerjoin
-        sub = select(RouteOpenEvent.route_id, func.count().label('open_count')).group_by(RouteOpenEvent.route_id).subquery()
-        from sqlalchemy import join
-        stmt = select(Route).outerjoin(sub, Route.id == sub.c.route_id).order_by((sub.c.open_count.is_(None)).asc(), sub.c.open_count.desc())
+        # Resolve tags through the route_tags inverted index instead of scanning
+        # tags_bitmask: 'any' matches routes with at least one of the bits (the
+        # old `tags_bitmask & tag != 0`), 'all' requires every bit.
+        bits = tag_bits(tag)
+        tagged = select(RouteTag.route_id).where(RouteTag.tag_bit.in_(bits))
         if region1:
-            stmt = stmt.where(Route.region1 == region1)
-        if tag is not None:
-            from sqlalchemy import literal
-            stmt = stmt.where((Route.tags_bitmask.op('&')(literal(tag))) != 0)
+            tagged = tagged.where(RouteTag.region1 == region1)
+        if tag_mode == 'all' and len(bits) > 1:
+            tagged = tagged.group_by(RouteTag.route_id).having(func.count() == len(bits))
+        filters.append(Route.id.in_(tagged))
+    return filters
 
-    result = await db.execute(stmt)
-    return list(result.scalars().all())
+
+async def _cached_total(db: AsyncSession, *filter_args) -> int:
+    key = filter_args
+    total = _total_cache.get(key)
+    if total is MISSING:
+        res = await db.execute(select(func.count()).select_from(Route).where(*_route_filters(*filter_args)))
+        total = int(res.scalar_one())
+        _total_cache.set(key, total)
+    return total
+
+
+# GET /routes page size when a cursor is sent without a limit
+DEFAULT_PAGE_SIZE = 50
+
+# GET /routes?view=card reads only these (plus revision for the ETag) through a Core
+# select; the Text columns (summary, open_url, nmap_url) never leave the database
+_CARD_COLUMNS = tuple(getattr(Route, name) for name in RouteCard.model_fields if name != 'viewer_state')
+
+
+@router.get("", response_model=list[RouteOut] | list[RouteCard])
+@router.get("/", response_model=list[RouteOut] | list[RouteCard])
+async def list_routes(
+    request: Request,
+    response: Response,
+    region1: str | None = None,
+    tag: int | None = None,
+    tag_mode: Literal['any', 'all'] = 'any',
+    min_km: float | None = Query(None, ge=0),
+    max_km: float | None = Query(None, ge=0),
+    min_curviness: float | None = Query(None, ge=0),
+    sort: str | None = None,
+    limit: int | None = Query(None, ge=1, le=200),
+    cursor: str | None = None,
+    include_total: bool = False,
+    with_state: bool = False,
+    view: Literal['full', 'card'] = 'full',
+    db: AsyncSession = Depends(get_db),
+    user: User | None = Depends(get_optional_user),
+):
+    """Keyset-paginated route list.
+
+    Rows are ordered by ``(sort key DESC, id DESC)`` (``id ASC`` without a sort),
+    and the ``X-Next-Cursor`` response header carries the last row's sort key and
+    id, so fetching any page costs the same as the first. ``include_total=true``
+    adds a briefly cached ``X-Total-Count``. ``view=card`` returns ``RouteCard`` items.
+
+    Without ``limit`` and ``cursor`` the whole list is returned, as before paging
+    existed (older clients don't follow ``X-Next-Cursor``); a ``cursor`` alone pages
+    by ``DEFAULT_PAGE_SIZE``.
+    """
+    if limit is None and cursor:
+        limit = DEFAULT_PAGE_SIZE
+    sort_mode = sort if sort in SORT_MODES else 'id'
+    card = view == 'card'
+    etag_kind = 'cards' if card else 'routes'
+    # card rows are plain (id, revision, *columns) tuples: no entities, no identity map
+    stmt = select(Route.id, Route.revision, *_CARD_COLUMNS[1:]) if card else select(Route)
+    if sort_mode == 'popular':
+        # stored like_count * 2 + comment_count; served by ix_routes_region1_popularity_score
+        sort_key = Route.popularity_score
+    elif sort_mode == 'comments':
+        # served by ix_routes_region1_comment_count
+        sort_key = Route.comment_count
+    elif sort_mode == 'latest':
+        # served by ix_routes_region1_created_at
+        sort_key = Route.created_at
+    elif sort_mode == 'opens':
+        # maintained by track_open; served by ix_routes_region1_open_count
+        sort_key = Route.open_count
+    elif sort_mode == 'length':
+        # computed from points on write; routes without points have no length to rank
+        sort_key = Route.length_km
+        stmt = stmt.where(Route.length_km.is_not(None))
+    elif sort_mode == 'curvy':
+        # degrees of heading change per km; served by ix_routes_region1_curviness
+        sort_key = Route.curviness
+        stmt = stmt.where(Route.curviness.is_not(None))
+    else:
+        sort_key = None
+
+    filter_args = (region1, tag, tag_mode, min_km, max_km, min_curviness)
+    stmt = stmt.where(*_route_filters(*filter_args))
+    if sort_key is None:
+        stmt = stmt.add_columns(Route.id).order_by(Route.id.asc())
+    else:
+        stmt = stmt.add_columns(sort_key).order_by(sort_key.desc(), Route.id.desc())
+
+    def keyset(page_stmt, after: tuple | None):
+        if after is None:
+            return page_stmt
+        after_key, after_id = after
+        if sort_key is None:
+            return page_stmt.where(Route.id > after_id)
+        return page_stmt.where(or_(sort_key < after_key, and_(sort_key == after_key, Route.id < after_id)))
+
+    async def load_page(after: tuple | None) -> tuple[list[dict], str | None, str]:
+        page_stmt = keyset(stmt, after)
+        if limit is not None:
+            page_stmt = page_stmt.limit(limit + 1)
+        rows = (await db.execute(page_stmt)).all()
+        next_cursor = None
+        has_more = limit is not None and len(rows) > limit
+        if has_more:
+            rows = rows[:limit]
+        if card:
+            stamps = [(row[0], row[1]) for row in rows]
+            items = [RouteCard.model_validate(row, from_attributes=True).model_dump() for row in rows]
+        else:
+            stamps = [(row[0].id, row[0].revision) for row in rows]
+            items = [RouteOut.model_validate(row[0]).model_dump() for row in rows]
+        if has_more:
+            # the sort key (or id) is always the last column
+            next_cursor = encode_cursor(sort_mode, rows[-1][-1], stamps[-1][0])
+        return items, next_cursor, page_etag(stamps, has_more, etag_kind)
+
+    # viewer state is per user, so those responses carry no ETag
+    conditional = not (with_state and user)
+    if cursor:
+        try:
+            after = decode_cursor(cursor, sort_mode)
+        except CursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if conditional and request.headers.get('if-none-match'):
+            # compare against (id, revision) stamps before loading full rows
+            stamp_stmt = keyset(stmt.with_only_columns(Route.id, Route.revision), after)
+            stamps = (await db.execute(stamp_stmt.limit(limit + 1))).all()
+            etag = page_etag(((row[0], row[1]) for row in stamps[:limit]), len(stamps) > limit, etag_kind)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+        items, next_cursor, etag = await load_page(after)
+    else:
+        # first pages are the hot ones; deeper pages always go to the database
+        items, next_cursor, etag = await response_cache.get_or_load(
+            ('list', *filter_args, sort_mode, limit, view),
+            lambda: load_page(None),
+            lambda page: list_page_tags(sort_mode, region1, (item['id'] for item in page[0])),
+        )
+        if conditional and etag_matches(request, etag):
+            return not_modified(etag)
+    if conditional:
+        response.headers['ETag'] = etag
+    else:
+        states = await viewer_states(db, user.id, (item['id'] for item in items))
+        items = [{**item, 'viewer_state': states[item['id']]} for item in items]
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    if include_total:
+        response.headers['X-Total-Count'] = str(await _cached_total(db, *filter_args))
+    if settings.fast_json_responses:
+        # items are RouteOut / RouteCard dumps already; skip response_model re-validation
+        return json_response(items, response)
+    return items
+
+
+@router.get("/facets", response_model=RouteFacetsOut)
+async def route_facets(
+    region1: str | None = None,
+    region2: str | None = None,
+    tag: int | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Facet counts read from route_facet_counts (a few hundred cells at most),
+    never a GROUP BY over routes."""
+    bits = tag_bits(tag) if tag is not None else []
+    if tag is not None and len(bits) != 1:
+        raise HTTPException(status_code=400, detail="tag must be a single bit for facets")
+    tag_cell = bits[0] if bits else ALL_TAGS
+    count = func.sum(RouteFacetCount.route_count)
+
+    def scoped(*, by_region1: bool = True, by_region2: bool = True) -> list:
+        filters = []
+        if by_region1 and region1:
+            filters.append(RouteFacetCount.region1 == region1)
+        if by_region2 and region2:
+            filters.append(RouteFacetCount.region2 == region2)
+        return filters
+
+    async def grouped(column, filters: list) -> dict:
+        res = await db.execute(select(column, count).where(*filters).group_by(column).having(count > 0))
+        return {key: int(n) for key, n in res.all() if key != ''}
+
+    total_res = await db.execute(select(count).where(RouteFacetCount.tag_bit == tag_cell, *scoped()))
+    return RouteFacetsOut(
+        total=int(total_res.scalar() or 0),
+        region1=await grouped(RouteFacetCount.region1, [RouteFacetCount.tag_bit == tag_cell, *scoped(by_region1=False)]),
+        region2=await grouped(RouteFacetCount.region2, [RouteFacetCount.tag_bit == tag_cell, *scoped(by_region2=False)]),
+        tags=await grouped(RouteFacetCount.tag_bit, [RouteFacetCount.tag_bit != ALL_TAGS, *scoped()]),
+    )
+
+
+@router.get("/nearby", response_model=list[RouteNearbyOut])
+async def list_nearby_routes(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(10.0, gt=0, le=NEARBY_MAX_RADIUS_KM),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+):
+    """Routes with a start or waypoint within ``radius_km``, nearest first.
+
+    Candidates come from the ``route_points.cell`` grid index and are refined with
+    haversine, so the result is exact and the cost follows the number of nearby points.
+    """
+    hits = (await nearby_routes(db, lat, lng, radius_km))[:limit]
+    if not hits:
+        return []
+    res = await db.execute(select(Route).where(Route.id.in_([route_id for route_id, _ in hits])))
+    by_id = {r.id: r for r in res.scalars().all()}
+    return [
+        RouteNearbyOut(**RouteOut.model_validate(by_id[route_id]).model_dump(), distance_km=round(distance, 3))
+        for route_id, distance in hits
+        if route_id in by_id
+    ]
+
+
+@router.get("/in-bbox", response_model=RouteBBoxOut)
+async def list_routes_in_bbox(
+    min_lat: float = Query(..., alias='minLat', ge=-90, le=90),
+    min_lng: float = Query(..., alias='minLng', ge=-180, le=180),
+    max_lat: float = Query(..., alias='maxLat', ge=-90, le=90),
+    max_lng: float = Query(..., alias='maxLng', ge=-180, le=180),
+    zoom: int = Query(..., ge=0, le=22),
+    max_markers: int = Query(200, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+):
+    """Map markers for every route with a point inside the viewport.
+
+    Up to ``max_markers`` routes come back as individual markers; beyond that they are
+    aggregated on a zoom-level grid into clusters with counts, so the payload stays
+    bounded however dense the area is.
+    """
+    if min_lat > max_lat or min_lng > max_lng:
+        raise HTTPException(status_code=400, detail="Invalid bounding box")
+    route_ids, lats, lngs = await route_markers(db, min_lat, min_lng, max_lat, max_lng)
+    total = len(route_ids)
+    if total <= max_markers:
+        titles = {}
+        if total:
+            res = await db.execute(select(Route.id, Route.title).where(Route.id.in_(route_ids.tolist())))
+            titles = dict(res.all())
+        markers = [
+            MapMarkerOut(lat=float(lat), lng=float(lng), route_id=int(route_id), title=titles.get(int(route_id)))
+            for route_id, lat, lng in zip(route_ids, lats, lngs)
+        ]
+        return RouteBBoxOut(total=total, clustered=False, markers=markers)
+    c_lats, c_lngs, counts, firsts = cluster_markers(route_ids, lats, lngs, zoom, max_markers)
+    markers = [
+        MapMarkerOut(lat=float(lat), lng=float(lng), count=int(count), route_id=int(first) if count == 1 else None)
+        for lat, lng, count, first in zip(c_lats, c_lngs, counts, firsts)
+    ]
+    return RouteBBoxOut(total=total, clustered=True, markers=markers)
+
+
+async def _similar_out(db: AsyncSession, hits: list[tuple[int, float]]) -> list[SimilarRouteOut]:
+    if not hits:
+        return []
+    res = await db.execute(select(Route.id, Route.title).where(Route.id.in_([route_id for route_id, _ in hits])))
+    titles = dict(res.all())
+    return [
+        SimilarRouteOut(route_id=route_id, title=titles[route_id], score=round(score, 3))
+        for route_id, score in hits
+        if route_id in titles
+    ]
+
+
+@router.post("/similar", response_model=list[SimilarRouteOut])
+async def find_similar_routes(payload: RouteSimilarIn, limit: int = Query(10, ge=1, le=50), db: AsyncSession = Depends(get_db)):
+    """Near-duplicates of a point list before it is saved, from the LSH index."""
+    signature = minhash_signature([(p.lat, p.lng) for p in payload.points])
+    hits = await similar_routes(db, signature, threshold=settings.similar_route_threshold, limit=limit)
+    return await _similar_out(db, hits)
+
+
+@router.get("/search", response_model=list[RouteSearchOut])
+async def search_route_list(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Routes matching ``q`` in title, summary, regions or waypoint names, by BM25 score.
+
+    Served from the ``route_search_postings`` bigram index. Pages follow ``X-Next-Cursor``
+    like ``GET /routes``; ``X-Total-Count`` is the number of matches.
+    """
+    hits = await search_routes(db, q)
+    # every match, not what is left after the cursor
+    response.headers['X-Total-Count'] = str(len(hits))
+    if cursor:
+        try:
+            after_score, after_id = decode_cursor(cursor, 'search')
+        except CursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        hits = [(rid, score) for rid, score in hits if (score, rid) < (after_score, after_id)]
+    page = hits[:limit]
+    if len(hits) > limit:
+        last_id, last_score = page[-1]
+        response.headers['X-Next-Cursor'] = encode_cursor('search', last_score, last_id)
+    if not page:
+        return []
+    res = await db.execute(select(Route).where(Route.id.in_([rid for rid, _ in page])))
+    by_id = {r.id: r for r in res.scalars().all()}
+    return [
+        RouteSearchOut(**RouteOut.model_validate(by_id[rid]).model_dump(), score=round(score, 4))
+        for rid, score in page
+        if rid in by_id
+    ]
+
+
+@router.get("/cache-stats")
+async def cache_stats():
+    return {
+        'responses': response_cache.stats(),
+        'parse': parse_cache_stats(),
+        'shortlinks': shortlink_expander.stats(),
+    }
 
 
 @router.get("/mine", response_model=list[RouteOut])
-async def list_my_routes(db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
+async def list_my_routes(with_state: bool = False, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
     stmt = select(Route).where(Route.author_id == user.id).order_by(Route.created_at.desc())
     result = await db.execute(stmt)
-    return list(result.scalars().all())
+    routes = list(result.scalars().all())
+    if with_state:
+        states = await viewer_states(db, user.id, (r.id for r in routes))
+        routes = [RouteOut.model_validate(r).model_copy(update={'viewer_state': states[r.id]}) for r in routes]
+    if settings.fast_json_responses:
+        return route_list_response(routes)
+    return routes
+
+
+async def _route_revision(db: AsyncSession, route_id: int) -> int:
+    revision = await db.scalar(select(Route.revision).where(Route.id == route_id))
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Route not found")
+    return revision
 
 
 @router.get("/{route_id}", response_model=RouteOut)
-async def get_route(route_id: int, db: AsyncSession = Depends(get_db)):
-    obj = await db.get(Route, route_id)
-    if not obj:
-        raise HTTPException(status_code=404, detail="Route not found")
-    return obj
+async def get_route(route_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    async def load() -> tuple[dict, str]:
+        obj = await db.get(Route, route_id)
+        if not obj:
+            # raised inside the loader so a 404 is never cached
+            raise HTTPException(status_code=404, detail="Route not found")
+        return RouteOut.model_validate(obj).model_dump(), route_etag('route', route_id, obj.revision)
+
+    # the ETag is cached with the body it was derived from and both are dropped by
+    # evict_route on writes, so a hit (or a 304) needs no database round trip
+    data, etag = await response_cache.get_or_load(('route', route_id), load, [route_tag(route_id)])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers['ETag'] = etag
+    return data
 
 
 @router.get("/{route_id}/photos")
-async def list_route_photos(route_id: int, db: AsyncSession = Depends(get_db)):
+async def list_route_photos(route_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    etag = route_etag('photos', route_id, await _route_revision(db, route_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers['ETag'] = etag
     res = await db.execute(select(RoutePhoto).where(RoutePhoto.route_id == route_id))
     return [
         {
@@ -253,6 +695,76 @@ async def list_route_photos(route_id: int, db: AsyncSession = Depends(get_db)):
     ]
 
 
+@router.get("/{route_id}/similar", response_model=list[SimilarRouteOut])
+async def list_similar_routes(route_id: int, limit: int = Query(10, ge=1, le=50), db: AsyncSession = Depends(get_db)):
+    row = await db.get(RouteSignature, route_id)
+    if row is None:
+        if not await db.get(Route, route_id):
+            raise HTTPException(status_code=404, detail="Route not found")
+        return []
+    signature = np.frombuffer(row.signature, dtype='<u4')
+    hits = await similar_routes(db, signature, exclude=route_id, threshold=settings.similar_route_threshold, limit=limit)
+    return await _similar_out(db, hits)
+
+
+@router.get("/{route_id}/geometry", response_model=RouteGeometryOut)
+async def get_route_geometry(route_id: int, format: Literal['json', 'packed'] = 'json', db: AsyncSession = Depends(get_db)):
+    """Route coordinates from the packed ``routes.geometry`` column (one column fetch).
+
+    ``format=packed`` returns the stored bytes as is: little-endian int32 ``(lat, lng)``
+    pairs in units of ``1 / X-Geometry-Scale`` degrees.
+    """
+    row = (await db.execute(select(Route.id, Route.geometry).where(Route.id == route_id))).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Route not found")
+    blob = row.geometry or b''
+    if format == 'packed':
+        return Response(content=blob, media_type='application/octet-stream', headers={'X-Geometry-Scale': str(GEOMETRY_SCALE)})
+    coords = unpack_geometry(blob)
+    return RouteGeometryOut(route_id=route_id, coords=coords.tolist())
+
+
+@router.get("/{route_id}/full", response_model=RouteFullOut)
+async def get_route_full(
+    route_id: int,
+    comment_sort: str | None = None,
+    comment_limit: int = Query(20, ge=0, le=100),
+    db: AsyncSession = Depends(get_db),
+    user: User | None = Depends(get_optional_user),
+):
+    """Route, ordered points, photos, first comment page and viewer state in one response.
+
+    Runs a fixed number of queries regardless of how many points, photos or comments
+    the route has: route, points, photos, viewer state and at most three for comments.
+    """
+    obj = await db.get(Route, route_id)
+    if not obj:
+        raise HTTPException(status_code=404, detail="Route not found")
+    points = (await db.execute(
+        select(RoutePoint).where(RoutePoint.route_id == route_id).order_by(RoutePoint.seq)
+    )).scalars().all()
+    photos = (await db.execute(
+        select(RoutePhoto).where(RoutePhoto.route_id == route_id).order_by(RoutePhoto.id)
+    )).scalars().all()
+    liked = bookmarked = False
+    if user:
+        liked, bookmarked = (await db.execute(select(
+            exists().where(Like.route_id == route_id, Like.user_id == user.id),
+            exists().where(Bookmark.route_id == route_id, Bookmark.user_id == user.id),
+        ))).one()
+    comments = []
+    if comment_limit:
+        comments = await comment_page(db, route_id, (comment_sort or "recent").lower(), user, limit=comment_limit)
+    return RouteFullOut(
+        route=RouteOut.model_validate(obj),
+        points=[Waypoint(lat=p.lat, lng=p.lng, name=p.name) for p in points],
+        photos=[RoutePhotoOut.model_validate(p) for p in photos],
+        comments=comments,
+        liked=bool(liked),
+        bookmarked=bool(bookmarked),
+    )
+
+
 class OpenTrackBody(BaseModel):
     userAgent: str | None = None
     referrer: str | None = None
@@ -266,6 +778,10 @@ async def track_open(route_id: int, body: OpenTrackBody | None = None, db: Async
                            referrer=(body.referrer if body else None),
                            platform=(body.platform if body else None))
     db.add(event)
+    # atomic increment so concurrent opens never lose a count. Opens are the hottest
+    # write and leave revision alone: open_count in cached/ETagged reads is eventually
+    # consistent (response cache TTL, next real write) instead of defeating every 304
+    await db.execute(update(Route).where(Route.id == route_id).values(open_count=Route.open_count + 1))
     await db.commit()
     return {"ok": True}
 
@@ -282,7 +798,10 @@ async def like_route(route_id: int, db: AsyncSession = Depends(get_db), user: Us
     # Create like and increment counter
     db.add(Like(route_id=route_id, user_id=user.id))
     obj.like_count = (obj.like_count or 0) + 1
+    obj.refresh_popularity_score()
+    obj.bump_revision()
     await db.commit()
+    evict_route(route_id, sorts=('popular',))
     await db.refresh(obj)
     return obj
 
@@ -297,7 +816,10 @@ async def unlike_route(route_id: int, db: AsyncSession = Depends(get_db), user:
     if like:
         await db.delete(like)
         obj.like_count = max(0, (obj.like_count or 0) - 1)
+        obj.refresh_popularity_score()
+        obj.bump_revision()
         await db.commit()
+        evict_route(route_id, sorts=('popular',))
         await db.refresh(obj)
     return obj
 
@@ -316,24 +838,33 @@ async def update_route(route_id: int, payload: RouteUpdate, db: AsyncSession = D
     if obj.author_id != user.id:
         raise HTTPException(status_code=403, detail="Not allowed")
 
+    facets_before = facet_snapshot(obj)
     # Update simple fields if provided
     for field in [
-        'title','summary','region1','region2','length_km','duration_min','stars_scenery','stars_difficulty',
+        'title','summary','region1','region2','duration_min','stars_scenery','stars_difficulty',
         'surface','traffic','speedbump','enforcement','signal','tags_bitmask','open_url','nmap_url']:
         value = getattr(payload, field)
         if value is not None:
             setattr(obj, field, value)
+    if payload.tags_bitmask is not None or payload.region1 is not None:
+        await sync_route_tags(db, obj)
+    await apply_facet_delta(db, facets_before, facet_snapshot(obj))
 
     # Replace points if provided
+    similar_ids = None
     if payload.points is not None:
-        # remove existing points
-        for p in list(obj.points or []):
-            await db.delete(p)
-        await db.flush()
-        for index, p in enumerate(payload.points or []):
-            db.add(RoutePoint(route_id=obj.id, seq=index, lat=p.lat, lng=p.lng, name=p.name, type=None))
+        similar_ids = await _write_points(db, obj, payload.points)
+    if payload.points is not None or any(
+        getattr(payload, field) is not None for field in ('title', 'summary', 'region1', 'region2')
+    ):
+        await index_route_text(db, obj)
 
+    obj.bump_revision()
     await db.commit()
+    evict_route(obj.id)
+    if payload.points is not None or (facets_before[0], facets_before[2]) != (obj.region1 or '', obj.tags_bitmask or 0):
+        # region1, tags or length changed: the route may join or leave filtered lists
+        evict_region_lists(facets_before[0], obj.region1)
     await db.refresh(obj)
-    return obj
+    return RouteOut.model_validate(obj).model_copy(update={'similar_route_ids': similar_ids})
 
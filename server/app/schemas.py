@@ -1,15 +1,18 @@
 from __future__ import annotations
 
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, computed_field
 from typing import Optional, Literal, List
 from datetime import datetime
 
 
 class Waypoint(BaseModel):
-    lat: float
-    lng: float
+    # finite and in range: packed geometry stores int32 1e-7 degrees, grid cells need real numbers
+    lat: float = Field(ge=-90, le=90)
+    lng: float = Field(ge=-180, le=180)
     name: Optional[str] = None
 
+    model_config = ConfigDict(allow_inf_nan=False)
+
 
 class RouteNormalized(BaseModel):
     modality: Literal['car', 'walk', 'bike']
@@ -21,6 +24,23 @@ class RouteNormalized(BaseModel):
     meta: dict
 
 
+class ParseBatchIn(BaseModel):
+    raws: List[str] = Field(default_factory=list, max_length=1000)
+
+
+class ParseBatchItem(BaseModel):
+    index: int
+    ok: bool
+    route: Optional[RouteNormalized] = None
+    error: Optional[str] = None
+
+
+class ParseBatchOut(BaseModel):
+    items: List[ParseBatchItem]
+    ok_count: int
+    error_count: int
+
+
 class RouteCreate(BaseModel):
     title: str
     summary: Optional[str] = None
@@ -61,6 +81,17 @@ class RouteUpdate(BaseModel):
     points: Optional[list[Waypoint]] = None
 
 
+class RouteViewerState(BaseModel):
+    route_id: int
+    liked: bool = False
+    bookmarked: bool = False
+    authored: bool = False
+
+
+class RouteStateIn(BaseModel):
+    route_ids: List[int] = Field(default_factory=list, max_length=200)
+
+
 class RouteOut(BaseModel):
     id: int
     author_id: Optional[int]
@@ -82,13 +113,105 @@ class RouteOut(BaseModel):
     nmap_url: Optional[str]
     like_count: int
     comment_count: int
+    open_count: Optional[int] = None
+    curviness: Optional[float] = None
     created_at: datetime
     # Whether this route has one or more photos
     # Optional for backward compatibility with older clients
     has_photos: Optional[bool] = None
+    photo_count: Optional[int] = None
+    # Only filled when a list is requested with with_state=true by a signed-in user
+    viewer_state: Optional[RouteViewerState] = None
+    # Only filled by create/update responses that wrote points: near-duplicate routes
+    similar_route_ids: Optional[List[int]] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class RouteCard(BaseModel):
+    """Compact list item (GET /routes?view=card): the columns the route list renders."""
+    id: int
+    title: str
+    region1: Optional[str]
+    region2: Optional[str]
+    length_km: Optional[float]
+    duration_min: Optional[int]
+    stars_scenery: Optional[int]
+    stars_difficulty: Optional[int]
+    tags_bitmask: Optional[int]
+    like_count: int
+    comment_count: int
+    curviness: Optional[float] = None
+    photo_count: Optional[int] = None
+    created_at: datetime
+    viewer_state: Optional[RouteViewerState] = None
 
     model_config = ConfigDict(from_attributes=True)
 
+    @computed_field
+    @property
+    def has_photos(self) -> bool:
+        return (self.photo_count or 0) > 0
+
+
+class RoutePhotoOut(BaseModel):
+    id: int
+    url: str
+    created_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class RouteNearbyOut(RouteOut):
+    # Great-circle distance from the query point to the route's nearest start/waypoint
+    distance_km: float
+
+
+class MapMarkerOut(BaseModel):
+    lat: float
+    lng: float
+    # Routes in this marker; route_id/title are set only for single-route markers
+    count: int = 1
+    route_id: Optional[int] = None
+    title: Optional[str] = None
+
+
+class RouteBBoxOut(BaseModel):
+    total: int
+    clustered: bool
+    markers: List[MapMarkerOut]
+
+
+class RouteGeometryOut(BaseModel):
+    route_id: int
+    # [lat, lng] pairs in route order
+    coords: List[List[float]]
+
+
+class RouteSimilarIn(BaseModel):
+    points: List[Waypoint] = Field(default_factory=list, max_length=1000)
+
+
+class SimilarRouteOut(BaseModel):
+    route_id: int
+    title: str
+    # MinHash estimate of the Jaccard similarity of the routes' grid cells
+    score: float
+
+
+class RouteSearchOut(RouteOut):
+    # BM25 relevance of the route for the query
+    score: float
+
+
+class RouteFacetsOut(BaseModel):
+    # Route counts for the home-screen filter chips. Each facet is scoped by the
+    # *other* active filters, so selecting a region1 doesn't hide its siblings.
+    total: int
+    region1: dict[str, int]
+    region2: dict[str, int]
+    tags: dict[int, int]
+
 
 class CommentCreate(BaseModel):
     content: str
@@ -105,6 +228,16 @@ class CommentOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class RouteFullOut(BaseModel):
+    # Everything the route-detail screen needs in one response
+    route: RouteOut
+    points: List[Waypoint]
+    photos: List[RoutePhotoOut]
+    comments: List[CommentOut]
+    liked: bool = False
+    bookmarked: bool = False
+
+
 class UserOut(BaseModel):
     id: int
     email: str
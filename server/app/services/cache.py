@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+MISSING: Any = object()
+
+
+class LRUCache:
+    """Bounded in-process LRU cache with optional per-entry TTL and hit/miss counters.
+
+    Not thread-safe; all callers run on the event loop thread.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # key -> (expires_at | None, value)
+        self._data: OrderedDict[Hashable, tuple[float | None, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, count=False) is not MISSING
+
+    def get(self, key: Hashable, default: Any = MISSING, count: bool = True) -> Any:
+        entry = self._data.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at is None or expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return value
+            del self._data[key]
+        if count:
+            self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = MISSING) -> None:
+        ttl = self.ttl if ttl is MISSING else ttl
+        expires_at = (time.monotonic() + ttl) if ttl is not None else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        return self._data.pop(key, None) is not None
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+class _Entry:
+    __slots__ = ('value', 'fresh_until', 'stale_until', 'tags')
+
+    def __init__(self, value: Any, fresh_until: float, stale_until: float, tags: frozenset[str]):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        self.tags = tags
+
+
+class ResponseCache:
+    """Read-through cache for serialized API responses.
+
+    Entries are fresh for ``ttl`` seconds and may then be served stale for
+    another ``stale_ttl`` seconds: the first caller to find an entry stale
+    reloads it while concurrent callers keep getting the stale copy. Every
+    entry carries tags (e.g. ``route:12``) and writers evict with
+    ``invalidate(*tags)``, which drops exactly the entries carrying any of them.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, stale_ttl: float = 0.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._data: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._by_tag: dict[str, set[Hashable]] = {}
+        self._refreshing: set[Hashable] = set()
+        # bumped by invalidate(); a load that overlapped an invalidation is not stored
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    async def get_or_load(self, key: Hashable, loader, tags) -> Any:
+        """Return the cached value for ``key`` or ``await loader()``.
+
+        ``tags`` is an iterable of tags, or a callable mapping the loaded value to them.
+        """
+        now = time.monotonic()
+        entry = self._data.get(key)
+        if entry is not None:
+            if now < entry.fresh_until:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return entry.value
+            if now < entry.stale_until and key in self._refreshing:
+                self.stale_hits += 1
+                return entry.value
+        self.misses += 1
+        generation = self._generation
+        self._refreshing.add(key)
+        try:
+            value = await loader()
+        finally:
+            self._refreshing.discard(key)
+        if generation == self._generation:
+            self._store(key, value, tags(value) if callable(tags) else tags)
+        return value
+
+    def _store(self, key: Hashable, value: Any, tags) -> None:
+        self._drop(key)
+        now = time.monotonic()
+        entry = _Entry(value, now + self.ttl, now + self.ttl + self.stale_ttl, frozenset(tags))
+        self._data[key] = entry
+        for tag in entry.tags:
+            self._by_tag.setdefault(tag, set()).add(key)
+        while len(self._data) > self.maxsize:
+            oldest = next(iter(self._data))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key: Hashable) -> bool:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return False
+        for tag in entry.tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+        return True
+
+    def invalidate(self, *tags: str) -> int:
+        self._generation += 1
+        dropped = 0
+        for tag in tags:
+            for key in list(self._by_tag.get(tag, ())):
+                dropped += self._drop(key)
+        self.invalidations += dropped
+        return dropped
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._by_tag.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': ((self.hits + self.stale_hits) / lookups) if lookups else 0.0,
+        }
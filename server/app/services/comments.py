@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Comment, CommentLike, User
+from app.schemas import CommentOut
+
+
+def _ts(c: Comment) -> int:
+    return int(c.created_at.timestamp() if hasattr(c.created_at, 'timestamp') else 0)
+
+
+async def comment_page(
+    db: AsyncSession,
+    route_id: int,
+    sort_mode: str = "recent",
+    user: User | None = None,
+    limit: int | None = None,
+) -> list[CommentOut]:
+    """Comments of a route with like counts and the viewer's likes, in at most three queries.
+
+    ``sort_mode`` is ``recent`` (default) or ``likes``; ``limit`` keeps the first N.
+    """
+    stmt = select(Comment).where(Comment.route_id == route_id)
+    if sort_mode != "likes" and limit is not None:
+        # recent order needs no like counts, so the page can be cut in SQL
+        stmt = stmt.order_by(Comment.created_at.desc(), Comment.id.desc()).limit(limit)
+    res = await db.execute(stmt)
+    comments = list(res.scalars().all())
+    if not comments:
+        return []
+
+    ids = [c.id for c in comments]
+
+    # Fetch like counts
+    cnt_res = await db.execute(
+        select(CommentLike.comment_id, func.count().label("cnt"))
+        .where(CommentLike.comment_id.in_(ids))
+        .group_by(CommentLike.comment_id)
+    )
+    id_to_count = {cid: int(cnt) for cid, cnt in cnt_res.all()}
+
+    # Fetch liked-by-me set
+    liked_set: set[int] = set()
+    if user:
+        liked_res = await db.execute(
+            select(CommentLike.comment_id)
+            .where(CommentLike.user_id == user.id, CommentLike.comment_id.in_(ids))
+        )
+        liked_set = {row[0] for row in liked_res.all()}
+
+    # Sort
+    if sort_mode == "likes":
+        comments.sort(key=lambda c: (-(id_to_count.get(c.id, 0)), -_ts(c)))
+    else:
+        comments.sort(key=lambda c: -_ts(c))
+    if limit is not None:
+        comments = comments[:limit]
+
+    return [
+        CommentOut(
+            id=c.id,
+            route_id=c.route_id,
+            content=c.content,
+            created_at=c.created_at,
+            like_count=id_to_count.get(c.id, 0),
+            liked_by_me=(c.id in liked_set),
+        )
+        for c in comments
+    ]
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Iterable
+
+from fastapi import Request, Response
+
+
+def route_etag(kind: str, route_id: int, revision: int, viewer_id: int | None = None) -> str:
+    """Strong ETag for a per-route read, derived from ``Route.revision``."""
+    if viewer_id is None:
+        return f'"{kind}-{route_id}-{revision}"'
+    return f'"{kind}-{route_id}-{revision}-u{viewer_id}"'
+
+
+def page_etag(stamps: Iterable[tuple[int, int]], has_more: bool, kind: str = "routes") -> str:
+    """Strong ETag for a list page from its ``(id, revision)`` pairs, in order.
+
+    ``kind`` tells representations of the same rows apart (full routes vs cards).
+    """
+    h = hashlib.blake2b(digest_size=12)
+    for route_id, revision in stamps:
+        h.update(b"%d:%d;" % (route_id, revision or 0))
+    h.update(b"+" if has_more else b".")
+    return f'"{kind}-{h.hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """``If-None-Match`` check (weak comparison, as RFC 9110 prescribes for it)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from typing import Any, Iterable
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+from app.schemas import RouteOut
+
+# Opt-in (settings.fast_json_responses) JSON path for list endpoints. The default
+# path returns objects and lets FastAPI validate them against response_model, build
+# JSON-mode dicts and json.dumps them. Here rows are validated and encoded in one
+# pydantic-core pass, and already-validated dicts go straight to orjson.
+
+_route_list = TypeAdapter(list[RouteOut])
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def _headers(response: Response | None) -> dict[str, str] | None:
+    # headers set on the injected Response are not applied to a returned Response
+    if response is None:
+        return None
+    return {k: v for k, v in response.headers.items() if k != 'content-length'}
+
+
+def json_response(content: Any, response: Response | None = None) -> Response:
+    """Encode plain data (e.g. cached ``RouteOut`` dumps) with orjson, skipping re-validation."""
+    return Response(orjson.dumps(content, default=_default), media_type='application/json', headers=_headers(response))
+
+
+def route_list_json(routes: Iterable[Any]) -> bytes:
+    """ORM routes (or ``RouteOut``s) → JSON array bytes in one pydantic-core pass."""
+    return _route_list.dump_json(_route_list.validate_python(list(routes), from_attributes=True))
+
+
+def route_list_response(routes: Iterable[Any], response: Response | None = None) -> Response:
+    return Response(route_list_json(routes), media_type='application/json', headers=_headers(response))
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+
+# Web Mercator (EPSG:3857) sphere radius, as used by map.naver.com path coordinates
+MERCATOR_RADIUS_M = 6378137.0
+# Largest argument math.exp() accepts; the scalar parser skips segments beyond it
+_MAX_EXP_ARG = math.log(np.finfo(np.float64).max)
+
+
+def mercator_to_wgs84(x_m: np.ndarray, y_m: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized EPSG:3857 → WGS84. Returns ``(lon, lat)`` arrays in degrees."""
+    x = np.asarray(x_m, dtype=np.float64)
+    y = np.asarray(y_m, dtype=np.float64)
+    lon = np.degrees(x / MERCATOR_RADIUS_M)
+    with np.errstate(over='ignore'):
+        lat = np.degrees(2.0 * np.arctan(np.exp(y / MERCATOR_RADIUS_M)) - (np.pi / 2.0))
+    return lon, lat
+
+
+def mercator_valid(y_m: np.ndarray) -> np.ndarray:
+    """Mask of rows the scalar conversion accepts (``math.exp`` would overflow otherwise)."""
+    return ~(np.asarray(y_m, dtype=np.float64) / MERCATOR_RADIUS_M > _MAX_EXP_ARG)
+
+
+# Mean Earth radius (IUGG) for great-circle distances
+EARTH_RADIUS_KM = 6371.0088
+_KM_PER_DEG_LAT = math.pi * EARTH_RADIUS_KM / 180.0
+
+# Spatial grid used by route_points.cell: GRID_DEG squares (~2.2 km tall), keyed
+# row-major as (lat_idx << GRID_LNG_BITS) | lng_idx so one latitude row of the
+# grid is one contiguous key range
+GRID_DEG = 0.02
+GRID_LNG_BITS = 16
+
+
+def haversine_km(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Vectorized great-circle distance from one point to many, in km."""
+    phi1 = math.radians(lat)
+    phi2 = np.radians(np.asarray(lats, dtype=np.float64))
+    dphi = phi2 - phi1
+    dlmb = np.radians(np.asarray(lngs, dtype=np.float64) - lng)
+    a = np.sin(dphi / 2.0) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2.0) ** 2
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _grid_idx(lat: float, lng: float) -> tuple[int, int]:
+    lat_idx = int(math.floor((min(max(lat, -90.0), 90.0) + 90.0) / GRID_DEG))
+    lng_idx = int(math.floor((min(max(lng, -180.0), 180.0) + 180.0) / GRID_DEG))
+    return lat_idx, lng_idx
+
+
+def grid_cell(lat: float, lng: float) -> int:
+    lat_idx, lng_idx = _grid_idx(lat, lng)
+    return (lat_idx << GRID_LNG_BITS) | lng_idx
+
+
+def grid_cell_ranges(min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> list[tuple[int, int]]:
+    """Inclusive ``cell`` key ranges covering a lat/lng box, one per grid row."""
+    lo_lat, lo_lng = _grid_idx(min_lat, min_lng)
+    hi_lat, hi_lng = _grid_idx(max_lat, max_lng)
+    return [
+        ((row << GRID_LNG_BITS) | lo_lng, (row << GRID_LNG_BITS) | hi_lng)
+        for row in range(lo_lat, hi_lat + 1)
+    ]
+
+
+def radius_box(lat: float, lng: float, radius_km: float) -> tuple[float, float, float, float]:
+    """``(min_lat, min_lng, max_lat, max_lng)`` enclosing a circle (no antimeridian wrap)."""
+    dlat = radius_km / _KM_PER_DEG_LAT
+    cos_lat = math.cos(math.radians(min(abs(lat) + dlat, 89.9)))
+    dlng = min(radius_km / (_KM_PER_DEG_LAT * cos_lat), 180.0)
+    return lat - dlat, max(lng - dlng, -180.0), lat + dlat, min(lng + dlng, 180.0)
+
+
+def path_length_km(coords) -> float:
+    """Great-circle length of a ``(lat, lng)`` polyline, summed over consecutive pairs."""
+    pts = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    if len(pts) < 2:
+        return 0.0
+    phi = np.radians(pts[:, 0])
+    dphi = np.diff(phi)
+    dlmb = np.radians(np.diff(pts[:, 1]))
+    a = np.sin(dphi / 2.0) ** 2 + np.cos(phi[:-1]) * np.cos(phi[1:]) * np.sin(dlmb / 2.0) ** 2
+    return float((2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))).sum())
+
+
+def curviness(coords) -> float:
+    """Twistiness of a ``(lat, lng)`` polyline: total absolute heading change in degrees
+    per km of length. 0 for a straight line; consecutive duplicate points are ignored."""
+    pts = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    if len(pts) > 1:
+        pts = pts[np.concatenate([[True], np.any(np.diff(pts, axis=0) != 0, axis=1)])]
+    if len(pts) < 3:
+        return 0.0
+    length = path_length_km(pts)
+    if length <= 0:
+        return 0.0
+    phi = np.radians(pts[:, 0])
+    dlmb = np.radians(np.diff(pts[:, 1]))
+    # initial bearing of each segment
+    bearing = np.degrees(np.arctan2(
+        np.sin(dlmb) * np.cos(phi[1:]),
+        np.cos(phi[:-1]) * np.sin(phi[1:]) - np.sin(phi[:-1]) * np.cos(phi[1:]) * np.cos(dlmb),
+    ))
+    turn = (np.diff(bearing) + 180.0) % 360.0 - 180.0
+    return float(np.abs(turn).sum() / length)
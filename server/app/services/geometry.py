@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+
+# Route geometry is stored packed on routes.geometry: little-endian int32 pairs
+# (lat, lng) in fixed point at GEOMETRY_SCALE units per degree (1e-7 deg, ~1 cm).
+# 8 bytes per point, read in one column fetch and viewed by NumPy without copying.
+GEOMETRY_SCALE = 10_000_000
+GEOMETRY_DTYPE = np.dtype('<i4')
+
+
+def pack_geometry(coords: Sequence[tuple[float, float]]) -> bytes | None:
+    """Pack ``(lat, lng)`` pairs; ``None`` for an empty route.
+
+    Raises ``ValueError`` for coordinates int32 fixed point can't hold (non-finite or
+    outside +-90 / +-180), which would otherwise wrap around silently.
+    """
+    if not len(coords):
+        return None
+    arr = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    if not np.isfinite(arr).all() or (np.abs(arr) > (90.0, 180.0)).any():
+        raise ValueError('coordinates out of range')
+    return np.rint(arr * GEOMETRY_SCALE).astype(GEOMETRY_DTYPE).tobytes()
+
+
+def geometry_view(blob: bytes | None) -> np.ndarray:
+    """Zero-copy ``(n, 2)`` int32 fixed-point view of a packed geometry."""
+    if not blob:
+        return np.empty((0, 2), dtype=GEOMETRY_DTYPE)
+    return np.frombuffer(blob, dtype=GEOMETRY_DTYPE).reshape(-1, 2)
+
+
+def unpack_geometry(blob: bytes | None) -> np.ndarray:
+    """``(n, 2)`` float64 ``(lat, lng)`` degrees."""
+    return geometry_view(blob) / GEOMETRY_SCALE
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(sort: str, key: Any, last_id: int) -> str:
+    """Opaque keyset cursor: the sort mode, the last row's sort key and its id."""
+    if isinstance(key, datetime):
+        key = {'dt': key.isoformat()}
+    payload = json.dumps({'s': sort, 'k': key, 'i': last_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple[Any, int]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        key = data['k']
+        if isinstance(key, dict) and 'dt' in key:
+            key = datetime.fromisoformat(key['dt'])
+        last_id = int(data['i'])
+        cursor_sort = data['s']
+    except Exception as e:
+        raise CursorError('Invalid cursor') from e
+    if cursor_sort != sort:
+        raise CursorError('Cursor does not match sort')
+    return key, last_id
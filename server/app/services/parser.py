@@ -1,9 +1,20 @@
 from __future__ import annotations
 
-from urllib.parse import parse_qsl, urlparse, unquote
+import hashlib
+import math
+import re
+from typing import Sequence
+from urllib.parse import parse_qsl, quote, urlparse, unquote
 from pydantic import BaseModel
 import logging
 
+import numpy as np
+
+from app.core.config import settings
+from app.services import geo
+from app.services.cache import LRUCache, MISSING
+from app.services.shortlinks import ShortlinkExpander, shortlink_expander
+
 logger = logging.getLogger(__name__)
 
 
@@ -11,63 +22,150 @@ class ParseError(Exception):
     pass
 
 
-def parse_naver_route(raw: str) -> dict:
-    logger.debug("parse_naver_route: raw=%r", raw[:500])
-    trim = raw.strip()
-    import re
+# Bump whenever parsing output changes; it is part of every parse-cache key, so
+# results produced by older parser logic are never served.
+PARSER_VERSION = "1"
+
+# Content-addressed cache of parse results keyed by the normalized link.
+_parse_cache = LRUCache(settings.parse_cache_size)
+
+
+# Patterns are compiled once at import time; parse_naver_route is on the hot path
+# for both /routes/parse and /routes/parse/batch.
+_LINK_RE = re.compile(r"(nmap://[^\s]+|intent://[^\s]+|https?://[^\s]+)", re.IGNORECASE)
+_BARE_HOST_RE = re.compile(r"\b((?:naver\.me|map\.naver\.com)/[^\s]+)", re.IGNORECASE)
+# Single dispatcher: one anchored scan decides which branch handles the link.
+_DISPATCH_RE = re.compile(
+    r"^(?:"
+    r"nmap://route/(?P<nmap_mode>[a-z]+)\?(?P<nmap_qs>.+)$"
+    r"|intent://route/(?P<intent_mode>[a-z]+)\?(?P<intent_qs>.+?)#Intent"
+    r"|(?P<web>https?://map\.naver\.com/(?:v5|p)/directions/)"
+    r"|(?P<short>https?://naver\.me/)"
+    r")",
+    re.IGNORECASE,
+)
+_WEB_DIRECTIONS_RE = re.compile(r"^https?://map\.naver\.com/(v5|p)/directions/", re.IGNORECASE)
+_WEB_PATH_RE = re.compile(r"/(v5|p)/directions/(.+)")
+
+
+def _extract_link(trim: str) -> str:
     # Extract first URL-like token to be robust against prefixes like '@' or surrounding text
-    m_url = re.search(r"(nmap://[^\s]+|intent://[^\s]+|https?://[^\s]+)", trim, re.IGNORECASE)
+    m_url = _LINK_RE.search(trim)
     if m_url:
-        trim = m_url.group(1)
-    else:
-        # handle bare host tokens like naver.me/xxxx or map.naver.com/...
-        m_host = re.search(r"\b((?:naver\.me|map\.naver\.com)/[^\s]+)", trim, re.IGNORECASE)
-        if m_host:
-            trim = "https://" + m_host.group(1)
-
-    # 1) nmap://route/{modality}?{qs}
-    m = re.match(r"^nmap://route/([a-z]+)\?(.+)$", trim, re.IGNORECASE)
-    if m:
-        return _parse_query(m.group(1), m.group(2), 'nmap', raw)
+        return m_url.group(1)
+    # handle bare host tokens like naver.me/xxxx or map.naver.com/...
+    m_host = _BARE_HOST_RE.search(trim)
+    if m_host:
+        return "https://" + m_host.group(1)
+    return trim
 
-    # 2) intent://route/{modality}?{qs}#Intent
-    m = re.match(r"^intent://route/([a-z]+)\?(.+?)#Intent", trim, re.IGNORECASE)
-    if m:
-        return _parse_query(m.group(1), m.group(2), 'intent', raw)
 
-    # 3) map.naver.com web best effort with coordinate extraction (v5 and p variants)
-    if re.match(r"^https?://map\.naver\.com/(v5|p)/directions/", trim, re.IGNORECASE):
-        return _parse_web_directions(trim, raw)
+def _dispatch(raw: str) -> tuple[str, re.Match | None]:
+    trim = _extract_link(raw.strip())
+    return trim, _DISPATCH_RE.match(trim)
+
+
+def parse_naver_route(raw: str) -> dict:
+    """Parse a shared Naver Map link without any network IO.
+
+    naver.me shortlinks get the ``web-short`` best-effort result here; use
+    ``resolve_naver_route`` to expand them first.
+    """
+    logger.debug("parse_naver_route: raw=%r", raw[:500])
+    trim, m = _dispatch(raw)
+    return _parse_dispatched(trim, m, raw)
+
+
+async def resolve_naver_route(raw: str, expander: ShortlinkExpander | None = None) -> dict:
+    """Like ``parse_naver_route`` but expands naver.me shortlinks on the shared async client."""
+    logger.debug("resolve_naver_route: raw=%r", raw[:500])
+    trim, m = _dispatch(raw)
+    if m is None or not m.group('short'):
+        return _parse_dispatched(trim, m, raw)
 
     # 4) naver.me shortlink: try to resolve to full directions URL, fallback to best-effort
-    if re.match(r"^https?://naver\.me/", trim, re.IGNORECASE):
+    logger.debug("Resolving shortlink: %s", trim)
+    expanded = await (expander or shortlink_expander).resolve(trim)
+    logger.debug("Shortlink expanded to: %s", expanded)
+    # re-run minimal checks against expanded
+    if expanded and _WEB_DIRECTIONS_RE.match(expanded):
+        parsed = _cached_parse(expanded, raw, lambda: _parse_web_directions(expanded, raw))
+        parsed['openUrl'] = raw  # preserve short link
+        parsed['meta']['raw'] = raw
+        parsed['meta']['expandedUrl'] = expanded
+        return parsed
+    return _shortlink_fallback(trim, raw)
+
+
+def shortlink_of(raw: str) -> str | None:
+    """Return the naver.me URL that ``resolve_naver_route`` would expand for ``raw``, if any."""
+    trim, m = _dispatch(raw)
+    return trim if m is not None and m.group('short') else None
+
+
+def parse_cache_key(link: str) -> bytes:
+    return hashlib.blake2b(f"{PARSER_VERSION}\x00{link}".encode('utf-8'), digest_size=16).digest()
+
+
+def parse_cache_stats() -> dict:
+    return {**_parse_cache.stats(), 'parser_version': PARSER_VERSION}
+
+
+def clear_parse_cache() -> None:
+    _parse_cache.clear()
+
+
+class _CachedError(str):
+    """Message of a ``ParseError`` in the parse cache.
+
+    The exception itself is not cached: its ``__traceback__`` would keep the
+    parser's frames alive for as long as the entry stays in the LRU.
+    """
+    __slots__ = ()
+
+
+def _cached_parse(link: str, raw: str, compute) -> dict:
+    key = parse_cache_key(link)
+    template = _parse_cache.get(key)
+    if template is MISSING:
         try:
-            import httpx
-            logger.debug("Resolving shortlink: %s", trim)
-            with httpx.Client(follow_redirects=True, timeout=3.0) as client:
-                resp = client.get(trim)
-                expanded = str(resp.url)
-                logger.debug("Shortlink expanded to: %s", expanded)
-                # re-run minimal checks against expanded
-                if re.match(r"^https?://map\.naver\.com/(v5|p)/directions/", expanded, re.IGNORECASE):
-                    parsed = _parse_web_directions(expanded, raw)
-                    parsed['openUrl'] = raw  # preserve short link
-                    parsed['meta']['raw'] = raw
-                    parsed['meta']['expandedUrl'] = expanded
-                    return parsed
-        except Exception:
-            logger.exception("Shortlink resolve failed: %s", trim)
-            pass
-        # fallback
-        logger.info("Shortlink fallback for: %s", trim)
-        return {
-            'modality': 'car',
-            'waypoints': [],
-            'dest': None,
-            'openUrl': trim,
-            'meta': {'source': 'web-short', 'raw': raw},
-            'nmapUrl': None,
-        }
+            template = compute()
+        except ParseError as e:
+            template = _CachedError(e)
+        _parse_cache.set(key, template)
+    if isinstance(template, _CachedError):
+        raise ParseError(str(template))
+    return _with_raw(template, raw)
+
+
+def _with_raw(template: dict, raw: str) -> dict:
+    # Copy everything mutable so callers can't corrupt the cached template,
+    # then re-apply the fields that depend on the raw input rather than the link.
+    result = dict(template)
+    result['waypoints'] = [dict(w) for w in template.get('waypoints') or []]
+    for key in ('start', 'dest'):
+        if template.get(key) is not None:
+            result[key] = dict(template[key])
+    result['meta'] = {**template['meta'], 'raw': raw}
+    if result['meta'].get('source') in ('nmap', 'intent'):
+        result['openUrl'] = raw
+    return result
+
+
+def _parse_dispatched(trim: str, m: re.Match | None, raw: str) -> dict:
+    if m:
+        # 1) nmap://route/{modality}?{qs}
+        if m.group('nmap_mode'):
+            return _cached_parse(trim, raw, lambda: _parse_query(m.group('nmap_mode'), m.group('nmap_qs'), 'nmap', raw))
+        # 2) intent://route/{modality}?{qs}#Intent
+        if m.group('intent_mode'):
+            return _cached_parse(trim, raw, lambda: _parse_query(m.group('intent_mode'), m.group('intent_qs'), 'intent', raw))
+        # 3) map.naver.com web best effort with coordinate extraction (v5 and p variants)
+        if m.group('web'):
+            return _cached_parse(trim, raw, lambda: _parse_web_directions(trim, raw))
+        # 4) naver.me shortlink without expansion (see resolve_naver_route)
+        if m.group('short'):
+            return _shortlink_fallback(trim, raw)
 
     # 5) Any other Naver web URL: accept best-effort to avoid 400s for variants
     try:
@@ -89,9 +187,20 @@ def parse_naver_route(raw: str) -> dict:
     raise ParseError('네이버 지도 공유 링크를 인식하지 못했어요.')
 
 
+def _shortlink_fallback(trim: str, raw: str) -> dict:
+    logger.info("Shortlink fallback for: %s", trim)
+    return {
+        'modality': 'car',
+        'waypoints': [],
+        'dest': None,
+        'openUrl': trim,
+        'meta': {'source': 'web-short', 'raw': raw},
+        'nmapUrl': None,
+    }
+
+
 def _parse_query(modality: str, qs: str, source: str, raw: str) -> dict:
     # replace + to %20 before parsing
-    from urllib.parse import urlencode
     params = dict(parse_qsl(qs.replace('+', '%20'), keep_blank_values=True))
 
     waypoints: list[dict] = []
@@ -144,24 +253,21 @@ def _parse_query(modality: str, qs: str, source: str, raw: str) -> dict:
 
 
 def _percent_encode(value: str) -> str:
-    from urllib.parse import quote
     return quote(str(value), safe='')
 
 
 def _mercator_to_wgs84(x_m: float, y_m: float) -> tuple[float, float]:
-    import math
     R = 6378137.0
     lon = (x_m / R) * (180.0 / math.pi)
     lat = (2.0 * math.atan(math.exp(y_m / R)) - (math.pi / 2.0)) * (180.0 / math.pi)
     return lon, lat
 
 
-def _parse_web_directions(url: str, raw: str) -> dict:
-    import re
+def _split_web_directions(url: str, xs: list[float], ys: list[float], names: list[str]) -> tuple[str | None, str]:
+    """Append each path segment's x, y and name to the given lists; return ``(variant, modality)``."""
     pr = urlparse(url)
     path = pr.path or ''
-    m = re.search(r"/(v5|p)/directions/(.+)", path)
-    places: list[dict] = []
+    m = _WEB_PATH_RE.search(path)
     modality = 'car'
     variant = None
     if m:
@@ -176,17 +282,22 @@ def _parse_web_directions(url: str, raw: str) -> dict:
                 parts = parts[:-1]
         for seg in parts:
             # each seg: x,y,name,id,TYPE
+            fields = seg.split(',')
+            if len(fields) < 3:
+                continue
             try:
-                fields = seg.split(',')
-                if len(fields) >= 3:
-                    x = float(fields[0])
-                    y = float(fields[1])
-                    name = unquote(fields[2])
-                    lon, lat = _mercator_to_wgs84(x, y)
-                    places.append({'lat': lat, 'lng': lon, 'name': name})
+                x = float(fields[0])
+                y = float(fields[1])
+                name = unquote(fields[2])
             except Exception:
                 continue
+            xs.append(x)
+            ys.append(y)
+            names.append(name)
+    return variant, modality
+
 
+def _assemble_web_directions(url: str, raw: str, variant: str | None, modality: str, places: list[dict]) -> dict:
     start = None
     dest = None
     waypoints: list[dict] = []
@@ -215,3 +326,65 @@ def _parse_web_directions(url: str, raw: str) -> dict:
                  modality, len(places), bool(start), bool(dest))
     return result
 
+
+def _parse_web_directions(url: str, raw: str) -> dict:
+    xs: list[float] = []
+    ys: list[float] = []
+    names: list[str] = []
+    variant, modality = _split_web_directions(url, xs, ys, names)
+    places: list[dict] = []
+    for x, y, name in zip(xs, ys, names):
+        try:
+            lon, lat = _mercator_to_wgs84(x, y)
+        except Exception:
+            continue
+        places.append({'lat': lat, 'lng': lon, 'name': name})
+    return _assemble_web_directions(url, raw, variant, modality, places)
+
+
+_WEB_BATCH_CHUNK = 1024
+
+
+def parse_web_directions_batch(urls: Sequence[str], raws: Sequence[str] | None = None) -> list[dict]:
+    """Bulk variant of the /v5 and /p directions parser for imports and backfills.
+
+    Splits every URL first, then converts all path segments in one NumPy
+    mercator→WGS84 pass. Produces the same dicts as parsing each URL on its own;
+    it bypasses the parse cache so large backfills don't flush hot entries.
+    """
+    results: list[dict] = []
+    # Chunking keeps the number of live intermediate tuples (and GC passes over them) small.
+    for lo in range(0, len(urls), _WEB_BATCH_CHUNK):
+        chunk_raws = raws[lo:lo + _WEB_BATCH_CHUNK] if raws is not None else None
+        results.extend(_parse_web_directions_chunk(urls[lo:lo + _WEB_BATCH_CHUNK], chunk_raws))
+    return results
+
+
+def _parse_web_directions_chunk(urls: Sequence[str], raws: Sequence[str] | None) -> list[dict]:
+    xs: list[float] = []
+    ys: list[float] = []
+    names: list[str] = []
+    heads: list[tuple[str | None, str, int]] = []
+    for url in urls:
+        variant, modality = _split_web_directions(url, xs, ys, names)
+        heads.append((variant, modality, len(xs)))
+
+    y_arr = np.array(ys, dtype=np.float64)
+    lons, lats = geo.mercator_to_wgs84(np.array(xs, dtype=np.float64), y_arr)
+    valid = geo.mercator_valid(y_arr)
+    all_valid = bool(valid.all())
+    lons_list, lats_list, valid_list = lons.tolist(), lats.tolist(), valid.tolist()
+
+    results: list[dict] = []
+    offset = 0
+    for index, (url, (variant, modality, end)) in enumerate(zip(urls, heads)):
+        if all_valid:
+            places = [{'lat': lat, 'lng': lng, 'name': name}
+                      for lat, lng, name in zip(lats_list[offset:end], lons_list[offset:end], names[offset:end])]
+        else:
+            places = [{'lat': lats_list[i], 'lng': lons_list[i], 'name': names[i]}
+                      for i in range(offset, end) if valid_list[i]]
+        offset = end
+        raw = raws[index] if raws is not None else url
+        results.append(_assemble_web_directions(url, raw, variant, modality, places))
+    return results
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+from app.core.config import settings
+from app.services.cache import ResponseCache
+
+
+# GET /routes/{id} and first pages of GET /routes. Values are RouteOut dumps.
+response_cache = ResponseCache(
+    settings.response_cache_size,
+    ttl=settings.response_cache_ttl_s,
+    stale_ttl=settings.response_cache_stale_s,
+)
+
+
+def route_tag(route_id: int) -> str:
+    return f"route:{route_id}"
+
+
+def list_page_tags(sort_mode: str, region1: str | None, route_ids: Iterable[int]) -> set[str]:
+    """Tags of a cached list page: its sort, its region filter and every route on it."""
+    return {
+        f"routes:sort:{sort_mode}",
+        f"routes:region:{region1 or '*'}",
+        *(route_tag(route_id) for route_id in route_ids),
+    }
+
+
+def evict_route(route_id: int, *, sorts: Iterable[str] = ()) -> None:
+    """A route's fields changed: drop its detail and every page showing it, plus
+    all pages of ``sorts`` whose ordering the change can affect."""
+    response_cache.invalidate(route_tag(route_id), *(f"routes:sort:{sort}" for sort in sorts))
+
+
+def evict_region_lists(*regions: str | None) -> None:
+    """Route membership changed in ``regions``: drop those pages and the unfiltered ones."""
+    response_cache.invalidate("routes:region:*", *(f"routes:region:{r}" for r in regions if r))
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from collections import Counter
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Route, RouteFacetCount, RouteTag
+
+
+TAG_BITS = 64
+# tag_bit value of the facet cell that counts every route regardless of tags
+ALL_TAGS = -1
+
+FacetSnapshot = tuple[str, str, int]
+
+
+def tag_bits(mask: int | None) -> list[int]:
+    """Set bit positions of a 64-bit tag mask (bit 63 arrives as a negative BigInteger)."""
+    if not mask:
+        return []
+    mask &= (1 << TAG_BITS) - 1
+    return [bit for bit in range(TAG_BITS) if mask >> bit & 1]
+
+
+async def sync_route_tags(db: AsyncSession, route: Route) -> None:
+    """Rewrite the ``route_tags`` rows for ``route`` from its bitmask and region1."""
+    await db.execute(delete(RouteTag).where(RouteTag.route_id == route.id))
+    bits = tag_bits(route.tags_bitmask)
+    if bits:
+        await db.execute(
+            insert(RouteTag),
+            [{'tag_bit': bit, 'route_id': route.id, 'region1': route.region1} for bit in bits],
+        )
+
+
+def facet_snapshot(route: Route) -> FacetSnapshot:
+    """The fields of ``route`` that decide which facet cells it is counted in."""
+    return (route.region1 or '', route.region2 or '', route.tags_bitmask or 0)
+
+
+def _facet_cells(snapshot: FacetSnapshot | None) -> list[tuple[str, str, int]]:
+    if snapshot is None:
+        return []
+    region1, region2, mask = snapshot
+    return [(region1, region2, ALL_TAGS)] + [(region1, region2, bit) for bit in tag_bits(mask)]
+
+
+async def apply_facet_delta(db: AsyncSession, before: FacetSnapshot | None, after: FacetSnapshot | None) -> None:
+    """Move a route's contribution between facet cells.
+
+    ``before=None`` records a created route, ``after=None`` a deleted one. Cells
+    shared by both snapshots are left untouched.
+    """
+    delta = Counter(_facet_cells(after))
+    delta.subtract(_facet_cells(before))
+    dialect = db.get_bind().dialect.name
+    for (region1, region2, tag_bit), change in delta.items():
+        if change == 0:
+            continue
+        key = (
+            RouteFacetCount.region1 == region1,
+            RouteFacetCount.region2 == region2,
+            RouteFacetCount.tag_bit == tag_bit,
+        )
+        if change > 0:
+            upsert = _facet_upsert(dialect, region1, region2, tag_bit, change)
+            if upsert is not None:
+                await db.execute(upsert)
+                continue
+            # no upsert for this dialect: lock the cell (or the gap where it would go) first
+            locked = await db.execute(select(RouteFacetCount.tag_bit).where(*key).with_for_update())
+            if locked.first() is None:
+                await db.execute(
+                    insert(RouteFacetCount).values(region1=region1, region2=region2, tag_bit=tag_bit, route_count=change)
+                )
+                continue
+        await db.execute(update(RouteFacetCount).where(*key).values(route_count=RouteFacetCount.route_count + change))
+
+
+def _facet_upsert(dialect: str, region1: str, region2: str, tag_bit: int, change: int):
+    """Single-statement increment, so two writers creating the same new cell can't both
+    INSERT and trip the primary key; ``None`` when the dialect has no upsert."""
+    values = {'region1': region1, 'region2': region2, 'tag_bit': tag_bit, 'route_count': change}
+    bumped = RouteFacetCount.route_count + change
+    if dialect == 'mysql':
+        return mysql.insert(RouteFacetCount).values(**values).on_duplicate_key_update(route_count=bumped)
+    if dialect in ('sqlite', 'postgresql'):
+        dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        return dialect_insert(RouteFacetCount).values(**values).on_conflict_do_update(
+            index_elements=['region1', 'region2', 'tag_bit'], set_={'route_count': bumped}
+        )
+    return None
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Iterable
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import Route, RoutePoint, RouteSearchDoc, RouteSearchPosting
+from app.services.cache import LRUCache, MISSING
+
+# Terms are character bigrams of each run of letters/digits, so Korean text (no
+# reliable word boundaries, particles glued to nouns) matches on any substring of
+# two or more characters. Single-character runs are indexed as they are.
+TERM_MAX_LEN = 32
+# Field weights applied to term frequencies
+FIELD_WEIGHTS = {'title': 3, 'region': 2, 'names': 2, 'summary': 1}
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_RUN_RE = re.compile(r"\w+")
+
+# (document count, average length) changes slowly; don't aggregate route_search_docs per query
+_stats_cache = LRUCache(1, ttl=settings.search_stats_ttl_s)
+
+
+def _normalize(text: str) -> str:
+    return unicodedata.normalize('NFKC', text).lower()
+
+
+def tokenize(text: str | None) -> list[str]:
+    if not text:
+        return []
+    terms: list[str] = []
+    for run in _RUN_RE.findall(_normalize(text)):
+        run = run.replace('_', '')
+        if len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def route_terms(
+    title: str | None,
+    summary: str | None,
+    region1: str | None,
+    region2: str | None,
+    names: Iterable[str | None] = (),
+) -> Counter:
+    """Field-weighted term frequencies of one route."""
+    tf: Counter = Counter()
+    fields = {
+        'title': [title],
+        'summary': [summary],
+        'region': [region1, region2],
+        'names': list(names),
+    }
+    for field, texts in fields.items():
+        weight = FIELD_WEIGHTS[field]
+        for text in texts:
+            for term in tokenize(text):
+                tf[term[:TERM_MAX_LEN]] += weight
+    return tf
+
+
+async def index_route_text(db: AsyncSession, route: Route, names: Iterable[str | None] | None = None) -> None:
+    """Rewrite a route's postings; call when its title, summary, regions or point names change.
+
+    ``names`` are the waypoint names; they are read from ``route_points`` when omitted.
+    """
+    if names is None:
+        names = (await db.execute(select(RoutePoint.name).where(RoutePoint.route_id == route.id))).scalars().all()
+    tf = route_terms(route.title, route.summary, route.region1, route.region2, names)
+    await db.execute(delete(RouteSearchPosting).where(RouteSearchPosting.route_id == route.id))
+    await db.execute(delete(RouteSearchDoc).where(RouteSearchDoc.route_id == route.id))
+    db.add(RouteSearchDoc(route_id=route.id, length=sum(tf.values())))
+    if tf:
+        await db.execute(insert(RouteSearchPosting), [
+            {'term': term, 'route_id': route.id, 'tf': count} for term, count in tf.items()
+        ])
+
+
+async def _collection_stats(db: AsyncSession) -> tuple[int, float]:
+    stats = _stats_cache.get('stats')
+    if stats is MISSING:
+        count, total = (await db.execute(
+            select(func.count(), func.coalesce(func.sum(RouteSearchDoc.length), 0))
+        )).one()
+        stats = (int(count), (float(total) / count) if count else 0.0)
+        _stats_cache.set('stats', stats)
+    return stats
+
+
+async def search_routes(db: AsyncSession, q: str) -> list[tuple[int, float]]:
+    """``(route_id, BM25 score)`` of matching routes, best first (ties by id desc).
+
+    Reads only the postings of the query's terms. A route must contain at least half of
+    the query's distinct terms; a one-character query matches every term starting with it.
+    """
+    terms = sorted(set(t[:TERM_MAX_LEN] for t in tokenize(q)))
+    if not terms:
+        return []
+    prefix = len(terms) == 1 and len(terms[0]) == 1
+    if prefix:
+        cond = RouteSearchPosting.term.startswith(terms[0], autoescape=True)
+    else:
+        cond = RouteSearchPosting.term.in_(terms)
+    rows = (await db.execute(
+        select(RouteSearchPosting.term, RouteSearchPosting.route_id, RouteSearchPosting.tf, RouteSearchDoc.length)
+        .join(RouteSearchDoc, RouteSearchDoc.route_id == RouteSearchPosting.route_id)
+        .where(cond)
+    )).all()
+    if not rows:
+        return []
+
+    n_docs, avgdl = await _collection_stats(db)
+    n_docs = max(n_docs, 1)
+    avgdl = avgdl or 1.0
+    df = Counter(term for term, _, _, _ in rows)
+    scores: dict[int, float] = {}
+    matched: Counter = Counter()
+    for term, route_id, tf, length in rows:
+        idf = math.log(1.0 + (n_docs - df[term] + 0.5) / (df[term] + 0.5))
+        norm = tf + BM25_K1 * (1.0 - BM25_B + BM25_B * (length or 0) / avgdl)
+        scores[route_id] = scores.get(route_id, 0.0) + idf * tf * (BM25_K1 + 1.0) / norm
+        matched[route_id] += 1
+    need = 1 if prefix else math.ceil(len(terms) / 2)
+    hits = [(route_id, score) for route_id, score in scores.items() if matched[route_id] >= need]
+    hits.sort(key=lambda item: (-item[1], -item[0]))
+    return hits
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urljoin, urlparse
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import ShortlinkExpansion
+from app.services.cache import LRUCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+
+# Once a redirect lands on one of these hosts we have everything the parser needs,
+# so the (large) map page itself is never downloaded.
+_FINAL_HOSTS = ('map.naver.com',)
+_MAX_REDIRECTS = 5
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failed or slow calls.
+
+    While open, ``allow()`` is False until ``reset_after_s`` has passed; then a
+    single trial call is let through (half-open) and its outcome closes or
+    re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int = 5, slow_call_s: float = 1.5, reset_after_s: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.slow_call_s = slow_call_s
+        self.reset_after_s = reset_after_s
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_after_s:
+            return 'half-open'
+        return 'open'
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half-open' and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record(self, ok: bool, elapsed_s: float) -> None:
+        self._trial_in_flight = False
+        if ok and elapsed_s <= self.slow_call_s:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning("Shortlink circuit opened after %d failed/slow expansions", self.failures)
+            self.opened_at = time.monotonic()
+
+
+class ShortlinkExpander:
+    """Expands naver.me shortlinks on a shared, pooled ``httpx.AsyncClient``.
+
+    The client is created by ``start()`` and released by ``aclose()``; the app
+    lifespan calls both. ``expand()`` starts the client lazily when used outside
+    the app (scripts, tests). Concurrent upstream lookups are bounded by a
+    semaphore so a burst of slow shortlinks cannot exhaust the pool.
+
+    ``resolve()`` adds the caching layer on top: an LRU with TTL (failures are
+    cached briefly as ``None``), single-flight so concurrent requests for one
+    shortlink share a lookup, and a circuit breaker that skips the upstream
+    entirely while it is failing. ``load_persisted()``/``persist()`` optionally
+    back the LRU with the ``shortlink_expansions`` table.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 3.0,
+        max_connections: int = 20,
+        max_concurrency: int = 10,
+        transport: httpx.AsyncBaseTransport | None = None,
+        cache_size: int = 10000,
+        cache_ttl_s: float = 24 * 3600,
+        negative_ttl_s: float = 60.0,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.negative_ttl_s = negative_ttl_s
+        self.cache = LRUCache(cache_size, ttl=cache_ttl_s)
+        self.breaker = breaker or CircuitBreaker()
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._inflight: dict[str, asyncio.Future] = {}
+        # expansions fetched from upstream but not yet written by persist()
+        self._unpersisted: set[str] = set()
+
+    @property
+    def started(self) -> bool:
+        return self._client is not None
+
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            follow_redirects=False,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+            transport=self._transport,
+        )
+        # asyncio primitives are bound to the running loop, so create them here
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def aclose(self) -> None:
+        client, self._client = self._client, None
+        self._semaphore = None
+        self._inflight.clear()
+        if client is not None:
+            await client.aclose()
+
+    async def expand(self, url: str) -> str:
+        """Follow redirects for ``url`` and return the final URL.
+
+        Raises ``httpx.HTTPError`` on network failures and timeouts.
+        """
+        if self._client is None:
+            await self.start()
+        assert self._client is not None and self._semaphore is not None
+        current = url
+        async with self._semaphore:
+            for _ in range(_MAX_REDIRECTS + 1):
+                # stream() so only the status line and headers are read
+                async with self._client.stream("GET", current) as resp:
+                    location = resp.headers.get("location")
+                    if not resp.is_redirect or not location:
+                        return str(resp.url)
+                current = urljoin(current, location)
+                if (urlparse(current).hostname or '').lower() in _FINAL_HOSTS:
+                    return current
+        raise httpx.TooManyRedirects(f"Too many redirects for {url}")
+
+    async def resolve(self, url: str) -> str | None:
+        """Cached ``expand()``: returns the expanded URL, or None when the upstream
+        failed recently or the circuit is open (callers fall back to ``web-short``).
+        """
+        cached = self.cache.get(url)
+        if cached is not MISSING:
+            return cached
+        inflight = self._inflight.get(url)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+        if not self.breaker.allow():
+            logger.info("Shortlink circuit open, skipping expansion: %s", url)
+            return None
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[url] = future
+        started = time.monotonic()
+        expanded: str | None = None
+        try:
+            expanded = await self.expand(url)
+        except asyncio.CancelledError:
+            # the caller went away (e.g. client disconnect); that says nothing about
+            # the upstream, so neither the breaker nor the negative cache records it.
+            # Joined callers fall back for this request only.
+            self._inflight.pop(url, None)
+            future.set_result(None)
+            raise
+        except Exception:
+            logger.exception("Shortlink resolve failed: %s", url)
+        self.breaker.record(expanded is not None, time.monotonic() - started)
+        if expanded is None:
+            self.cache.set(url, None, ttl=self.negative_ttl_s)
+        else:
+            self.cache.set(url, expanded)
+            self._unpersisted.add(url)
+        self._inflight.pop(url, None)
+        future.set_result(expanded)
+        return expanded
+
+    async def load_persisted(self, db: AsyncSession, urls: list[str]) -> None:
+        """Warm the LRU from the DB table with one IN query."""
+        missing = [u for u in dict.fromkeys(urls) if u not in self.cache]
+        if not missing:
+            return
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.shortlink_db_ttl_s)
+        res = await db.execute(
+            select(ShortlinkExpansion.short_url, ShortlinkExpansion.expanded_url)
+            .where(ShortlinkExpansion.short_url.in_(missing), ShortlinkExpansion.created_at >= cutoff)
+        )
+        for short_url, expanded_url in res.all():
+            self.cache.set(short_url, expanded_url)
+
+    async def persist(self, db: AsyncSession, urls: list[str]) -> None:
+        """Write expansions for ``urls`` fetched since the last persist to the DB table."""
+        pending = {u: self.cache.get(u, count=False) for u in urls if u in self._unpersisted}
+        pending = {u: e for u, e in pending.items() if isinstance(e, str)}
+        self._unpersisted.difference_update(urls)
+        if not pending:
+            return
+        try:
+            res = await db.execute(select(ShortlinkExpansion).where(ShortlinkExpansion.short_url.in_(list(pending))))
+            existing = {row.short_url: row for row in res.scalars().all()}
+            now = datetime.utcnow()
+            for short_url, expanded_url in pending.items():
+                row = existing.get(short_url)
+                if row is None:
+                    db.add(ShortlinkExpansion(short_url=short_url, expanded_url=expanded_url, created_at=now))
+                else:
+                    row.expanded_url = expanded_url
+                    row.created_at = now
+            await db.commit()
+        except Exception:
+            # another worker may have inserted the same shortlink; the cache is best-effort
+            logger.exception("Persisting shortlink expansions failed")
+            await db.rollback()
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), 'inflight': len(self._inflight), 'circuit': self.breaker.state}
+
+
+shortlink_expander = ShortlinkExpander(
+    timeout=settings.shortlink_timeout_s,
+    max_connections=settings.shortlink_max_connections,
+    max_concurrency=settings.shortlink_max_concurrency,
+    cache_size=settings.shortlink_cache_size,
+    cache_ttl_s=settings.shortlink_cache_ttl_s,
+    negative_ttl_s=settings.shortlink_negative_ttl_s,
+    breaker=CircuitBreaker(
+        failure_threshold=settings.shortlink_breaker_failures,
+        slow_call_s=settings.shortlink_breaker_slow_s,
+        reset_after_s=settings.shortlink_breaker_reset_s,
+    ),
+)
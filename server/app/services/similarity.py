@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Sequence
+
+import numpy as np
+from sqlalchemy import and_, delete, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import RouteLshBand, RouteSignature
+from app.services.geo import GRID_DEG, GRID_LNG_BITS
+
+# MinHash over the set of grid cells a route passes through, banded for LSH.
+# 16 bands x 4 rows puts the 50% candidate threshold at Jaccard ~0.5.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Waypoints are joined by straight segments sampled every SAMPLE_KM, so two shares of
+# a course with different waypoints still cover mostly the same cells
+SAMPLE_KM = 0.5
+MAX_SAMPLES = 5000
+_PRIME = (1 << 31) - 1
+_KM_PER_DEG = 111.195
+
+
+def _coefficients() -> tuple[np.ndarray, np.ndarray]:
+    # derived from a hash rather than an RNG so stored signatures never depend on NumPy's generator
+    a, b = [], []
+    for i in range(NUM_PERM):
+        d = hashlib.blake2b(b"route-minhash:%d" % i, digest_size=8).digest()
+        a.append(int.from_bytes(d[:4], 'little') % (_PRIME - 1) + 1)
+        b.append(int.from_bytes(d[4:], 'little') % _PRIME)
+    return np.array(a, dtype=np.int64), np.array(b, dtype=np.int64)
+
+
+_A, _B = _coefficients()
+
+
+def route_shingles(coords: Sequence[tuple[float, float]]) -> np.ndarray:
+    """Unique grid cells (``geo.grid_cell`` keys) along the route's sampled polyline."""
+    if not coords:
+        return np.empty(0, dtype=np.int64)
+    pts = np.asarray([(lat, lng) for lat, lng in coords], dtype=np.float64)
+    if len(pts) > 1:
+        seg = np.diff(pts, axis=0)
+        seg_km = np.hypot(seg[:, 0], seg[:, 1] * np.cos(np.radians(pts[:-1, 0]))) * _KM_PER_DEG
+        steps = np.clip(np.ceil(seg_km / SAMPLE_KM).astype(np.int64), 1, None)
+        if steps.sum() > MAX_SAMPLES:
+            steps = np.maximum(1, steps * MAX_SAMPLES // steps.sum())
+        t = np.concatenate([np.arange(n) / n for n in steps])
+        starts = np.repeat(pts[:-1], steps, axis=0)
+        pts = np.vstack([starts + np.repeat(seg, steps, axis=0) * t[:, None], pts[-1:]])
+    lat_idx = np.floor((np.clip(pts[:, 0], -90.0, 90.0) + 90.0) / GRID_DEG).astype(np.int64)
+    lng_idx = np.floor((np.clip(pts[:, 1], -180.0, 180.0) + 180.0) / GRID_DEG).astype(np.int64)
+    return np.unique((lat_idx << GRID_LNG_BITS) | lng_idx)
+
+
+def minhash_signature(coords: Sequence[tuple[float, float]]) -> np.ndarray | None:
+    """``NUM_PERM`` uint32 minimums of ``(a*x + b) mod p`` over the route's shingles."""
+    shingles = route_shingles(coords)
+    if not len(shingles):
+        return None
+    x = shingles % _PRIME
+    return ((_A[:, None] * x[None, :] + _B[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def band_buckets(signature: np.ndarray) -> list[int]:
+    """One signed 64-bit bucket key per LSH band."""
+    rows = signature.astype('<u4').reshape(BANDS, ROWS)
+    return [
+        int.from_bytes(hashlib.blake2b(row.tobytes(), digest_size=8).digest(), 'little', signed=True)
+        for row in rows
+    ]
+
+
+def estimated_jaccard(signature: np.ndarray, other: np.ndarray) -> float:
+    return float(np.mean(signature == other))
+
+
+async def index_route_geometry(db: AsyncSession, route_id: int, coords: Sequence[tuple[float, float]]) -> np.ndarray | None:
+    """Rewrite a route's signature and LSH band rows; call whenever its points change."""
+    await db.execute(delete(RouteLshBand).where(RouteLshBand.route_id == route_id))
+    await db.execute(delete(RouteSignature).where(RouteSignature.route_id == route_id))
+    signature = minhash_signature(coords)
+    if signature is None:
+        return None
+    db.add(RouteSignature(route_id=route_id, signature=signature.astype('<u4').tobytes()))
+    await db.execute(insert(RouteLshBand), [
+        {'band': band, 'bucket': bucket, 'route_id': route_id}
+        for band, bucket in enumerate(band_buckets(signature))
+    ])
+    return signature
+
+
+async def similar_routes(
+    db: AsyncSession,
+    signature: np.ndarray | None,
+    *,
+    exclude: int | None = None,
+    threshold: float = 0.5,
+    limit: int = 10,
+) -> list[tuple[int, float]]:
+    """``(route_id, estimated Jaccard)`` of indexed routes sharing an LSH bucket, best first.
+
+    Only routes in the same buckets are read, so cost follows the number of candidates
+    rather than the number of routes.
+    """
+    if signature is None:
+        return []
+    buckets = band_buckets(signature)
+    cand = select(RouteLshBand.route_id).where(
+        or_(*(and_(RouteLshBand.band == band, RouteLshBand.bucket == bucket) for band, bucket in enumerate(buckets)))
+    ).distinct()
+    if exclude is not None:
+        cand = cand.where(RouteLshBand.route_id != exclude)
+    res = await db.execute(select(RouteSignature).where(RouteSignature.route_id.in_(cand)))
+    scored = []
+    for row in res.scalars().all():
+        score = estimated_jaccard(signature, np.frombuffer(row.signature, dtype='<u4'))
+        if score >= threshold:
+            scored.append((row.route_id, score))
+    scored.sort(key=lambda item: (-item[1], item[0]))
+    return scored[:limit]
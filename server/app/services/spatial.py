@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from typing import Any, Iterable
+
+import numpy as np
+from sqlalchemy import and_, delete, func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import RoutePoint
+from app.services.geo import grid_cell, grid_cell_ranges, haversine_km, radius_box
+
+# Largest radius accepted by nearby_routes callers (GET /routes/nearby)
+NEARBY_MAX_RADIUS_KM = 100.0
+# Boxes up to this many grid rows get one key range per row; the bound covers
+# NEARBY_MAX_RADIUS_KM (~90 rows). Taller (zoomed-out map) boxes merge adjacent rows
+# into this many ranges: each merged range also reads the rest of the latitude band
+# between its rows, which stays small next to a box that tall and wide. The lat/lng
+# filter keeps results exact
+_MAX_CELL_RANGES = 128
+# Cluster cell edge in screen pixels at the requested zoom (256 px tiles)
+CLUSTER_PX = 64
+
+
+def _coords(p: Any) -> tuple[float, float, str | None]:
+    if isinstance(p, dict):
+        return float(p['lat']), float(p['lng']), p.get('name')
+    return float(p.lat), float(p.lng), p.name
+
+
+async def replace_route_points(db: AsyncSession, route_id: int, points: Iterable[Any]) -> list[tuple[float, float, str | None]]:
+    """Rewrite a route's ``route_points`` (with grid cells) in one DELETE and one bulk INSERT.
+
+    ``points`` are ``Waypoint``-like objects or ``{lat, lng, name?}`` dicts in route order.
+    Returns the normalized ``(lat, lng, name)`` tuples.
+    """
+    coords = [_coords(p) for p in points]
+    await db.execute(delete(RoutePoint).where(RoutePoint.route_id == route_id))
+    if coords:
+        await db.execute(insert(RoutePoint), [
+            {'route_id': route_id, 'seq': seq, 'lat': lat, 'lng': lng, 'name': name, 'type': None, 'cell': grid_cell(lat, lng)}
+            for seq, (lat, lng, name) in enumerate(coords)
+        ])
+    return coords
+
+
+def box_cell_ranges(min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> list[tuple[int, int]]:
+    """At most ``_MAX_CELL_RANGES`` inclusive ``cell`` ranges covering the box."""
+    ranges = grid_cell_ranges(min_lat, min_lng, max_lat, max_lng)
+    if len(ranges) <= _MAX_CELL_RANGES:
+        return ranges
+    # coarsen: each range runs from the first to the last of `step` adjacent rows
+    step = -(-len(ranges) // _MAX_CELL_RANGES)
+    return [(ranges[i][0], ranges[min(i + step, len(ranges)) - 1][1]) for i in range(0, len(ranges), step)]
+
+
+def _in_box(min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> tuple:
+    return (
+        or_(*(RoutePoint.cell.between(lo, hi) for lo, hi in box_cell_ranges(min_lat, min_lng, max_lat, max_lng))),
+        RoutePoint.lat.between(min_lat, max_lat),
+        RoutePoint.lng.between(min_lng, max_lng),
+    )
+
+
+def _arrays(rows) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    if not rows:
+        empty = np.empty(0)
+        return empty.astype(np.int64), empty, empty
+    route_ids, lats, lngs = zip(*rows)
+    return np.fromiter(route_ids, np.int64, len(rows)), np.asarray(lats, np.float64), np.asarray(lngs, np.float64)
+
+
+async def points_in_box(
+    db: AsyncSession, min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """``(route_ids, lats, lngs)`` of every indexed point inside the box, ordered by route and seq.
+
+    Reads only the grid rows covering the box (one index range per row), so cost follows
+    the number of points near the box rather than the table size.
+    """
+    stmt = (
+        select(RoutePoint.route_id, RoutePoint.lat, RoutePoint.lng)
+        .where(*_in_box(min_lat, min_lng, max_lat, max_lng))
+        .order_by(RoutePoint.route_id, RoutePoint.seq)
+    )
+    return _arrays((await db.execute(stmt)).all())
+
+
+async def nearby_routes(db: AsyncSession, lat: float, lng: float, radius_km: float) -> list[tuple[int, float]]:
+    """``(route_id, distance_km)`` for routes with any point within ``radius_km``, nearest first.
+
+    Grid cells give the candidates; haversine over their points makes the result exact.
+    """
+    route_ids, lats, lngs = await points_in_box(db, *radius_box(lat, lng, radius_km))
+    if not len(route_ids):
+        return []
+    dist = haversine_km(lat, lng, lats, lngs)
+    inside = dist <= radius_km
+    route_ids, dist = route_ids[inside], dist[inside]
+    if not len(route_ids):
+        return []
+    # nearest point per route: sort by distance, keep each route's first occurrence
+    order = np.argsort(dist, kind='stable')
+    uniq, first = np.unique(route_ids[order], return_index=True)
+    best = dist[order][first]
+    ranked = np.argsort(best, kind='stable')
+    return [(int(uniq[i]), float(best[i])) for i in ranked]
+
+
+def cluster_markers(
+    route_ids: np.ndarray, lats: np.ndarray, lngs: np.ndarray, zoom: int, max_markers: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Grid-aggregate route markers for a map zoom level.
+
+    Returns ``(lats, lngs, counts, first_route_ids)`` per cluster: the centroid,
+    the number of routes and the smallest route id in it. Cells are ``CLUSTER_PX`` screen
+    pixels wide at ``zoom`` and are doubled until at most ``max_markers`` clusters remain.
+    """
+    cell_deg = 360.0 / (2 ** zoom) * (CLUSTER_PX / 256.0)
+    while True:
+        keys = np.stack([np.floor(lats / cell_deg), np.floor(lngs / cell_deg)], axis=1).astype(np.int64)
+        uniq, inverse = np.unique(keys, axis=0, return_inverse=True)
+        if len(uniq) <= max_markers:
+            break
+        cell_deg *= 2.0
+    inverse = inverse.reshape(-1)
+    counts = np.bincount(inverse)
+    first = np.full(len(uniq), np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(first, inverse, route_ids)
+    return (
+        np.bincount(inverse, weights=lats) / counts,
+        np.bincount(inverse, weights=lngs) / counts,
+        counts,
+        first,
+    )
+
+
+async def route_markers(
+    db: AsyncSession, min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """One marker per route intersecting the box, at its first point inside the box.
+
+    The database picks each route's first point (``GROUP BY route_id``), so one row per
+    route comes back however many of its points the box holds.
+    """
+    first = (
+        select(RoutePoint.route_id, func.min(RoutePoint.seq).label('seq'))
+        .where(*_in_box(min_lat, min_lng, max_lat, max_lng))
+        .group_by(RoutePoint.route_id)
+        .subquery()
+    )
+    stmt = (
+        select(RoutePoint.route_id, RoutePoint.lat, RoutePoint.lng)
+        .join(first, and_(RoutePoint.route_id == first.c.route_id, RoutePoint.seq == first.c.seq))
+        .order_by(RoutePoint.route_id)
+    )
+    return _arrays((await db.execute(stmt)).all())
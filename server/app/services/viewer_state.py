@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Bookmark, Like, Route
+from app.schemas import RouteViewerState
+
+
+async def viewer_states(db: AsyncSession, user_id: int, route_ids: Iterable[int]) -> dict[int, RouteViewerState]:
+    """Liked/bookmarked/authored flags of ``user_id`` for many routes: one ``IN`` query per table."""
+    ids = list(dict.fromkeys(route_ids))
+    if not ids:
+        return {}
+    liked = set((await db.execute(
+        select(Like.route_id).where(Like.user_id == user_id, Like.route_id.in_(ids))
+    )).scalars())
+    bookmarked = set((await db.execute(
+        select(Bookmark.route_id).where(Bookmark.user_id == user_id, Bookmark.route_id.in_(ids))
+    )).scalars())
+    authored = set((await db.execute(
+        select(Route.id).where(Route.author_id == user_id, Route.id.in_(ids))
+    )).scalars())
+    return {
+        route_id: RouteViewerState(
+            route_id=route_id,
+            liked=route_id in liked,
+            bookmarked=route_id in bookmarked,
+            authored=route_id in authored,
+        )
+        for route_id in ids
+    }
@@ -0,0 +1,84 @@
+"""Scalar vs NumPy Web-Mercator → WGS84 conversion.
+
+Run from server/:  python benchmarks/bench_mercator.py [--sizes 10000 1000000]
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# make `app` importable when run as a script from server/
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services import geo  # noqa: E402
+from app.services.parser import _mercator_to_wgs84, _parse_web_directions, parse_web_directions_batch  # noqa: E402
+
+
+def _points(n: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    # roughly the Korean peninsula in EPSG:3857 metres
+    rng = np.random.default_rng(seed)
+    return rng.uniform(13.9e6, 14.5e6, n), rng.uniform(3.9e6, 4.7e6, n)
+
+
+def _links(n_points: int, per_link: int = 5) -> list[str]:
+    xs, ys = _points(n_points)
+    links = []
+    for i in range(0, n_points, per_link):
+        segs = "/".join(f"{x:.7f},{y:.7f},P{j},{j},PLACE_POI" for j, (x, y) in enumerate(zip(xs[i:i + per_link], ys[i:i + per_link])))
+        links.append(f"https://map.naver.com/v5/directions/{segs}/car")
+    return links
+
+
+def _best(fn, repeat: int) -> float:
+    # like timeit: best of N with the cyclic GC paused during each run
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        finally:
+            gc.enable()
+    return best
+
+
+def bench_conversion(n: int, repeat: int) -> tuple[float, float]:
+    xs, ys = _points(n)
+    xs_list, ys_list = xs.tolist(), ys.tolist()
+    scalar = _best(lambda: [_mercator_to_wgs84(x, y) for x, y in zip(xs_list, ys_list)], repeat)
+    vector = _best(lambda: geo.mercator_to_wgs84(xs, ys), repeat)
+    return scalar, vector
+
+
+def bench_links(n: int, repeat: int) -> tuple[float, float]:
+    links = _links(n)
+    scalar = _best(lambda: [_parse_web_directions(u, u) for u in links], repeat)
+    vector = _best(lambda: parse_web_directions_batch(links), repeat)
+    return scalar, vector
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000])
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--skip-links', action='store_true', help='only benchmark the coordinate conversion')
+    args = ap.parse_args()
+
+    print(f"{'case':<12}{'points':>10}{'scalar s':>12}{'numpy s':>12}{'speedup':>10}")
+    for n in args.sizes:
+        scalar, vector = bench_conversion(n, args.repeat)
+        print(f"{'convert':<12}{n:>10}{scalar:>12.4f}{vector:>12.4f}{scalar / vector:>9.1f}x")
+        if not args.skip_links:
+            scalar, vector = bench_links(n, args.repeat)
+            print(f"{'links':<12}{n:>10}{scalar:>12.4f}{vector:>12.4f}{scalar / vector:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""Per-branch parser throughput/latency with a regression gate against a stored baseline.
+
+Run from server/:
+    python benchmarks/bench_parser.py                    # compare with baseline, exit 1 on regression
+    python benchmarks/bench_parser.py --update-baseline  # record a new baseline on this machine
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import logging
+import statistics
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# make `app` importable when run as a script from server/
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.parser import ParseError, clear_parse_cache, parse_naver_route  # noqa: E402
+
+HERE = Path(__file__).resolve().parent
+CORPUS = HERE / 'corpus' / 'parser_links.v1.jsonl'
+BASELINE = HERE / 'baselines' / 'parser.json'
+METRICS = ('p50_us', 'p95_us', 'p99_us')
+
+
+def load_corpus(path: Path = CORPUS) -> dict[str, list[str]]:
+    by_branch: dict[str, list[str]] = defaultdict(list)
+    with path.open(encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                by_branch[row['branch']].append(row['raw'])
+    return dict(by_branch)
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _call(raw: str) -> None:
+    try:
+        parse_naver_route(raw)
+    except ParseError:
+        pass
+
+
+def bench_branch(raws: list[str], iterations: int, warm: bool) -> dict:
+    samples: list[float] = []
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            for raw in raws:
+                if not warm:
+                    clear_parse_cache()
+                t0 = time.perf_counter_ns()
+                _call(raw)
+                samples.append((time.perf_counter_ns() - t0) / 1000.0)
+    finally:
+        gc.enable()
+    samples.sort()
+    mean_us = statistics.fmean(samples)
+    return {
+        'calls': len(samples),
+        'ops_per_s': round(1e6 / mean_us, 1),
+        'p50_us': round(_percentile(samples, 0.50), 2),
+        'p95_us': round(_percentile(samples, 0.95), 2),
+        'p99_us': round(_percentile(samples, 0.99), 2),
+    }
+
+
+def calibrate(samples: int = 300) -> float:
+    """Median time (us) of a fixed pure-Python workload. Measured next to every
+    branch so results can be expressed relative to how fast the machine is
+    running at that moment, which makes baselines far less sensitive to noise."""
+    timings = []
+    for _ in range(samples):
+        t0 = time.perf_counter_ns()
+        acc = 0
+        for i in range(50):
+            acc += len(str(i * 7919).split('1'))
+        timings.append((time.perf_counter_ns() - t0) / 1000.0)
+    return statistics.median(timings)
+
+
+def run(iterations: int, rounds: int) -> dict[str, dict]:
+    corpus = load_corpus()
+    per_round: dict[str, list[dict]] = defaultdict(list)
+    # rounds interleave the branches so a noisy moment doesn't skew one of them
+    for _ in range(rounds):
+        for branch, raws in sorted(corpus.items()):
+            for warm in (False, True):
+                # one untimed pass so imports/regex caches don't land in the numbers
+                for raw in raws:
+                    _call(raw)
+                before = calibrate()
+                stats = bench_branch(raws, iterations, warm)
+                unit = statistics.fmean([before, calibrate()])
+                for metric in METRICS:
+                    stats[f"{metric}_rel"] = round(stats[metric] / unit, 4)
+                per_round[f"{branch}:{'warm' if warm else 'cold'}"].append(stats)
+    # report the median round for every statistic
+    return {
+        case: {key: statistics.median(r[key] for r in rs) for key in rs[0]}
+        for case, rs in per_round.items()
+    }
+
+
+def compare(
+    results: dict[str, dict],
+    baseline: dict[str, dict],
+    max_regression: float,
+    metrics: list[str],
+) -> list[str]:
+    """Return one message per (case, metric) slower than the baseline by more than ``max_regression``."""
+    failures = []
+    for case, current in results.items():
+        base = baseline.get(case)
+        if not base:
+            continue
+        for metric in metrics:
+            if not base.get(metric):
+                continue
+            if current[metric] > base[metric] * (1.0 + max_regression):
+                failures.append(f"{case} {metric}: {current[metric]:.2f} > {base[metric]:.2f} (+{max_regression:.0%} allowed)")
+    return failures
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--iterations', type=int, default=100, help='passes over each branch corpus per round')
+    ap.add_argument('--rounds', type=int, default=5, help='repeat rounds; the median round is reported')
+    ap.add_argument('--max-regression', type=float, default=0.30, help='allowed slowdown vs baseline (0.30 = 30%%)')
+    ap.add_argument('--metrics', nargs='+', default=['p50_us', 'p95_us'], choices=METRICS)
+    ap.add_argument('--absolute', action='store_true',
+                    help='gate on raw microseconds instead of values relative to the calibration workload')
+    ap.add_argument('--baseline', type=Path, default=BASELINE)
+    ap.add_argument('--update-baseline', action='store_true')
+    args = ap.parse_args()
+
+    # junk inputs log a warning per call; keep terminal IO out of the timings
+    logging.disable(logging.WARNING)
+    results = run(args.iterations, args.rounds)
+    print(f"{'case':<18}{'ops/s':>12}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}")
+    for case, r in results.items():
+        print(f"{case:<18}{r['ops_per_s']:>12.0f}{r['p50_us']:>10.2f}{r['p95_us']:>10.2f}{r['p99_us']:>10.2f}")
+
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        payload = {'corpus': CORPUS.name, 'results': results}
+        args.baseline.write_text(json.dumps(payload, indent=2, sort_keys=True) + '\n', encoding='utf-8')
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"no baseline at {args.baseline}; run with --update-baseline first")
+        return 0
+    baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+    if baseline.get('corpus') != CORPUS.name:
+        print(f"baseline was recorded for {baseline.get('corpus')}, not {CORPUS.name}; re-record it")
+        return 1
+    metrics = args.metrics if args.absolute else [f"{m}_rel" for m in args.metrics]
+    failures = compare(results, baseline['results'], args.max_regression, metrics)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
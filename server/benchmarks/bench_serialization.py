@@ -0,0 +1,100 @@
+"""FastAPI response_model serialization vs the fastjson (pydantic-core / orjson) path.
+
+Run from server/:  python benchmarks/bench_serialization.py [--rows 20 100 1000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+# make `app` importable when run as a script from server/
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.db.models import Route  # noqa: E402
+from app.schemas import RouteOut  # noqa: E402
+from app.services.fastjson import json_response, route_list_response  # noqa: E402
+
+_FIELD = create_model_field(name='Response_list_routes', type_=list[RouteOut], mode='serialization')
+_LOOP = asyncio.new_event_loop()
+
+
+def _routes(n: int) -> list[Route]:
+    t0 = datetime(2026, 1, 1, 9, 30)
+    return [
+        Route(
+            id=i + 1, author_id=i % 50, title=f'북한강 와인딩 코스 {i}', summary='청평에서 가평까지, 주말 오전 추천',
+            region1='경기', region2='가평군', length_km=42.5 + i % 17, duration_min=60 + i % 40,
+            stars_scenery=4, stars_difficulty=3, surface='paved', traffic='low', speedbump=1, enforcement=0,
+            signal=2, tags_bitmask=0b1011, open_url=f'https://map.naver.com/p/directions/{i}', nmap_url=None,
+            like_count=i % 90, comment_count=i % 12, open_count=i * 3, curviness=123.4 + i % 7,
+            photo_count=i % 3, created_at=t0 + timedelta(minutes=i, microseconds=i),
+        )
+        for i in range(n)
+    ]
+
+
+def _best(fn, repeat: int) -> float:
+    # like timeit: best of N with the cyclic GC paused during each run
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        finally:
+            gc.enable()
+    return best
+
+
+def _fastapi_response(content) -> JSONResponse:
+    # what FastAPI does with a returned value when the route has response_model=list[RouteOut]
+    data = _LOOP.run_until_complete(serialize_response(field=_FIELD, response_content=content, is_coroutine=True))
+    return JSONResponse(data)
+
+
+def bench(n: int, repeat: int) -> dict[str, tuple[float, float]]:
+    routes = _routes(n)
+    # GET /routes serves cached RouteOut dumps; /routes/mine and /bookmarks/ serve ORM rows
+    dumps = [RouteOut.model_validate(r).model_dump() for r in routes]
+    # same documents, only whitespace differs (json.dumps vs compact orjson)
+    expected = json.loads(_fastapi_response(routes).body)
+    assert json.loads(route_list_response(routes).body) == expected
+    assert json.loads(json_response(dumps).body) == expected
+    return {
+        'orm rows': (
+            _best(lambda: _fastapi_response(routes), repeat),
+            _best(lambda: route_list_response(routes), repeat),
+        ),
+        'dicts': (
+            _best(lambda: _fastapi_response(dumps), repeat),
+            _best(lambda: json_response(dumps), repeat),
+        ),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--rows', type=int, nargs='+', default=[20, 100, 1000])
+    ap.add_argument('--repeat', type=int, default=20)
+    args = ap.parse_args()
+
+    print(f"{'case':<12}{'rows':>8}{'fastapi ms':>13}{'fast ms':>10}{'speedup':>10}")
+    for n in args.rows:
+        for case, (slow, fast) in bench(n, args.repeat).items():
+            print(f"{case:<12}{n:>8}{slow * 1e3:>13.3f}{fast * 1e3:>10.3f}{slow / fast:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from fastapi.testclient import TestClient
+
+
+def login(client: TestClient, email: str) -> None:
+    client.post("/api/auth/register", json={"email": email, "password": "secret"})
+    client.post("/api/auth/login", json={"email": email, "password": "secret"})
+
+
+def create_route(client: TestClient, region1: str) -> int:
+    r = client.post("/api/routes", json={"title": "R", "region1": region1, "open_url": "https://map.naver.com/v5/..."})
+    return r.json()["id"]
+
+
+def test_route_state_batch(client: TestClient):
+    login(client, "author@example.com")
+    mine = create_route(client, "StateR")
+    login(client, "viewer@example.com")
+    other = create_route(client, "StateR")
+    client.post(f"/api/routes/{mine}/like")
+    client.post(f"/api/bookmarks/route/{mine}")
+
+    r = client.post("/api/me/route-state", json={"route_ids": [mine, other, mine]})
+    assert r.status_code == 200
+    states = {s["route_id"]: s for s in r.json()}
+    assert len(r.json()) == 2
+    assert states[mine] == {"route_id": mine, "liked": True, "bookmarked": True, "authored": False}
+    assert states[other] == {"route_id": other, "liked": False, "bookmarked": False, "authored": True}
+
+    rows = client.get("/api/routes", params={"region1": "StateR", "with_state": True}).json()
+    embedded = {row["id"]: row["viewer_state"] for row in rows}
+    assert embedded[mine]["liked"] is True and embedded[other]["authored"] is True
+    assert "ETag" not in client.get("/api/routes", params={"region1": "StateR", "with_state": True}).headers
+
+    assert all(row["viewer_state"] is None for row in client.get("/api/routes", params={"region1": "StateR"}).json())
+
+
+def test_route_state_requires_login(client: TestClient):
+    client.post("/api/auth/logout")
+    assert client.post("/api/me/route-state", json={"route_ids": [1]}).status_code == 401
@@ -49,3 +49,102 @@ def test_missing_dest_error():
     except ParseError:
         pass
 
+
+
+def test_prefixed_and_embedded_links():
+    raw = "@ 경로 공유 nmap://route/bike?dlat=37.2&dlng=127.2&dname=End 확인"
+    r = parse_naver_route(raw)
+    assert r['modality'] == 'bike'
+    assert r['meta']['source'] == 'nmap'
+    assert r['dest']['name'] == 'End'
+
+
+def test_junk_text_error():
+    try:
+        parse_naver_route("그냥 텍스트입니다")
+        assert False, "expected ParseError"
+    except ParseError:
+        pass
+
+
+def test_parse_cache_hits_and_raw_fields():
+    from app.services.parser import clear_parse_cache, parse_cache_stats
+
+    clear_parse_cache()
+    link = "nmap://route/car?dlat=37.5&dlng=127.5&dname=Cached"
+    before = parse_cache_stats()
+    first = parse_naver_route(link)
+    first['dest']['name'] = 'mutated'
+    second = parse_naver_route("공유: " + link)
+    after = parse_cache_stats()
+    assert after['misses'] == before['misses'] + 1
+    assert after['hits'] == before['hits'] + 1
+    # cached template is not affected by callers; raw-derived fields follow the input
+    assert second['dest']['name'] == 'Cached'
+    assert second['openUrl'] == "공유: " + link
+    assert second['meta']['raw'] == "공유: " + link
+
+
+def test_parse_cache_replays_errors():
+    from app.services.parser import _parse_cache, parse_cache_key
+
+    raw = "nmap://route/car?slat=37.1&slng=127.1&appname=cached-error"
+    messages = []
+    for _ in range(2):
+        try:
+            parse_naver_route(raw)
+            assert False, "expected ParseError"
+        except ParseError as e:
+            messages.append(str(e))
+    assert messages[0] == messages[1]
+    # only the message is cached, not the exception with its traceback
+    cached = _parse_cache.get(parse_cache_key(raw))
+    assert not isinstance(cached, BaseException) and str(cached) == messages[0]
+
+
+def test_web_directions_batch_matches_scalar():
+    from app.services.parser import _parse_web_directions, parse_web_directions_batch
+
+    urls = [
+        "https://map.naver.com/p/directions/14156584.2247297,4502987.1950958,%EC%97%AC%EC%A7%84,19221459,PLACE_POI/14158056.9815929,4505955.7856538,B,1988104171,PLACE_POI/14161159.0995789,4499670.8705344,C,1915773188,PLACE_POI/car?c=13.00,0,0,0,dh",
+        "https://map.naver.com/v5/directions/14142058.54,4518168.75,Start/14143000.00,4519000.00,Mid/14150000.00,4520000.00,End/walk",
+        "https://map.naver.com/v5/directions/bad,4518168.75,Skip/14142058.54,1e300,Overflow/14142058.54,4518168.75,Only",
+    ]
+    batch = parse_web_directions_batch(urls)
+    assert len(batch) == len(urls)
+    for url, got in zip(urls, batch):
+        want = _parse_web_directions(url, url)
+        assert got['modality'] == want['modality']
+        assert (got['start'] is None) == (want['start'] is None)
+        assert [p['name'] for p in got['waypoints']] == [p['name'] for p in want['waypoints']]
+        for key in ('start', 'dest'):
+            if want[key]:
+                assert abs(got[key]['lat'] - want[key]['lat']) < 1e-9
+                assert abs(got[key]['lng'] - want[key]['lng']) < 1e-9
+                assert got[key]['name'] == want[key]['name']
+    assert batch[0]['dest']['name'] == 'B'
+    assert batch[1]['modality'] == 'walk' and len(batch[1]['waypoints']) == 1
+
+
+def test_benchmark_corpus_covers_every_branch():
+    from benchmarks.bench_parser import load_corpus
+
+    expected = {'nmap': 'nmap', 'intent': 'intent', 'web-v5': 'web', 'web-p': 'web', 'shortlink': 'web-short', 'junk': None}
+    corpus = load_corpus()
+    assert set(corpus) == set(expected)
+    for branch, raws in corpus.items():
+        for raw in raws:
+            try:
+                source = parse_naver_route(raw)['meta']['source']
+            except ParseError:
+                source = None
+            assert source == expected[branch], (branch, raw)
+
+
+def test_benchmark_regression_gate():
+    from benchmarks.bench_parser import compare
+
+    baseline = {'nmap:cold': {'p50_us': 100.0, 'p95_us': 200.0}}
+    assert compare({'nmap:cold': {'p50_us': 125.0, 'p95_us': 210.0}}, baseline, 0.30, ['p50_us', 'p95_us']) == []
+    failures = compare({'nmap:cold': {'p50_us': 140.0, 'p95_us': 210.0}}, baseline, 0.30, ['p50_us', 'p95_us'])
+    assert len(failures) == 1 and 'p50_us' in failures[0]
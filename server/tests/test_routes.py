@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import pytest
 from fastapi.testclient import TestClient
 from app.core.auth import create_token
 
@@ -36,6 +37,21 @@ def test_parse_endpoint(client: TestClient):
     assert r.json()["openUrl"].startswith("nmap://route/") or r.json()["meta"]["source"] in ("web", "web-short", "nmap", "intent")
 
 
+def test_parse_batch_endpoint(client: TestClient):
+    raws = [
+        "nmap://route/car?dlat=37.2&dlng=127.2",
+        "intent://route/walk?dlat=37.3&dlng=127.3#Intent;scheme=nmap;end",
+        "not a link",
+    ]
+    r = client.post("/api/routes/parse/batch", json={"raws": raws})
+    assert r.status_code == 200
+    data = r.json()
+    assert data["ok_count"] == 2 and data["error_count"] == 1
+    assert [item["index"] for item in data["items"]] == [0, 1, 2]
+    assert data["items"][1]["route"]["modality"] == "walk"
+    assert data["items"][2]["ok"] is False and data["items"][2]["error"]
+
+
 def test_create_and_get_route(client: TestClient):
     route_id = create_sample_route(client)
     r = client.get(f"/api/routes/{route_id}")
@@ -80,3 +96,697 @@ def test_update_route_permissions(client: TestClient, app):
         r = c2.patch(f"/api/routes/{route_id}", json={"title": "Hack"})
     assert r.status_code == 403
 
+
+
+def test_list_routes_keyset_pagination(client: TestClient):
+    region = "Paging"
+    ids = []
+    for i in range(5):
+        r = client.post("/api/routes", json={"title": f"P{i}", "region1": region, "open_url": "https://map.naver.com/"})
+        ids.append(r.json()["id"])
+
+    for sort in (None, "latest", "popular", "comments", "opens"):
+        seen: list[int] = []
+        cursor = None
+        while True:
+            params = {"region1": region, "limit": 2}
+            if sort:
+                params["sort"] = sort
+            if cursor:
+                params["cursor"] = cursor
+            r = client.get("/api/routes", params=params)
+            assert r.status_code == 200
+            page = [row["id"] for row in r.json()]
+            assert len(page) <= 2
+            seen.extend(page)
+            cursor = r.headers.get("x-next-cursor")
+            if not cursor:
+                break
+        assert sorted(seen) == sorted(ids), sort
+        assert len(seen) == len(set(seen)), sort
+    r = client.get("/api/routes", params={"region1": region, "include_total": "true", "limit": 1})
+    assert r.headers["x-total-count"] == "5"
+
+
+def test_list_routes_without_limit_returns_everything(client: TestClient, monkeypatch):
+    import app.routers.routes as routes_module
+
+    monkeypatch.setattr(routes_module, "DEFAULT_PAGE_SIZE", 2)
+    region = "Unbounded"
+    ids = [client.post("/api/routes", json={"title": f"U{i}", "region1": region, "open_url": "u"}).json()["id"] for i in range(5)]
+
+    # older clients send no limit and never follow X-Next-Cursor
+    r = client.get("/api/routes", params={"region1": region})
+    assert [row["id"] for row in r.json()] == ids
+    assert "x-next-cursor" not in r.headers
+    first = client.get("/api/routes", params={"region1": region, "limit": 2})
+    # a cursor without a limit keeps paging
+    second = client.get("/api/routes", params={"region1": region, "cursor": first.headers["x-next-cursor"]})
+    assert [row["id"] for row in second.json()] == ids[2:4]
+
+
+def test_list_routes_rejects_bad_cursor(client: TestClient):
+    r = client.get("/api/routes", params={"cursor": "not-a-cursor"})
+    assert r.status_code == 400
+    first = client.get("/api/routes", params={"sort": "latest", "limit": 1})
+    cursor = first.headers.get("x-next-cursor")
+    if cursor:
+        r = client.get("/api/routes", params={"sort": "popular", "cursor": cursor})
+        assert r.status_code == 400
+
+
+def test_open_track_maintains_open_count(client: TestClient):
+    region = "Opens"
+    a = client.post("/api/routes", json={"title": "A", "region1": region, "open_url": "u"}).json()["id"]
+    b = client.post("/api/routes", json={"title": "B", "region1": region, "open_url": "u"}).json()["id"]
+    for _ in range(3):
+        assert client.post(f"/api/routes/{b}/open-track", json={"platform": "ios"}).status_code == 200
+    client.post(f"/api/routes/{a}/open-track")
+
+    assert client.get(f"/api/routes/{b}").json()["open_count"] == 3
+    r = client.get("/api/routes", params={"region1": region, "sort": "opens"})
+    assert [row["id"] for row in r.json()] == [b, a]
+
+
+def test_popular_sort_uses_maintained_score(client: TestClient):
+    login(client, email="popular@example.com")
+    region = "Popular"
+    a = client.post("/api/routes", json={"title": "A", "region1": region, "open_url": "u"}).json()["id"]
+    b = client.post("/api/routes", json={"title": "B", "region1": region, "open_url": "u"}).json()["id"]
+    c = client.post("/api/routes", json={"title": "C", "region1": region, "open_url": "u"}).json()["id"]
+    assert client.post(f"/api/routes/{b}/like").status_code == 200
+    assert client.post(f"/api/comments/route/{c}", json={"content": "nice"}).status_code == 200
+
+    r = client.get("/api/routes", params={"region1": region, "sort": "popular"})
+    assert [row["id"] for row in r.json()] == [b, c, a]
+
+    client.post(f"/api/routes/{b}/unlike")
+    r = client.get("/api/routes", params={"region1": region, "sort": "popular"})
+    assert [row["id"] for row in r.json()] == [c, b, a]
+
+
+def test_tag_filter_uses_tag_index(client: TestClient):
+    login(client, email="tags@example.com")
+    region = "Tagged"
+
+    def make(mask: int) -> int:
+        return client.post("/api/routes", json={"title": "T", "region1": region, "tags_bitmask": mask, "open_url": "u"}).json()["id"]
+
+    one, both, two = make(0b01), make(0b11), make(0b10)
+
+    def ids(**params) -> list[int]:
+        r = client.get("/api/routes", params={"region1": region, **params})
+        assert r.status_code == 200
+        return sorted(row["id"] for row in r.json())
+
+    assert ids(tag=0b01) == sorted([one, both])
+    assert ids(tag=0b11) == sorted([one, both, two])
+    assert ids(tag=0b11, tag_mode="all") == [both]
+
+    r = client.patch(f"/api/routes/{one}", json={"tags_bitmask": 0b110})
+    assert r.status_code == 200
+    assert ids(tag=0b11, tag_mode="all") == [both]
+    assert ids(tag=0b100) == [one]
+
+
+def test_facets_follow_creates_and_updates(client: TestClient):
+    login(client, email="facets@example.com")
+
+    def make(region2: str, mask: int) -> int:
+        payload = {"title": "F", "region1": "FacetR", "region2": region2, "tags_bitmask": mask, "open_url": "u"}
+        return client.post("/api/routes", json=payload).json()["id"]
+
+    make("A", 0b01)
+    second = make("A", 0b11)
+    make("B", 0)
+
+    r = client.get("/api/routes/facets", params={"region1": "FacetR"})
+    assert r.status_code == 200
+    data = r.json()
+    assert data["total"] == 3
+    assert data["region1"]["FacetR"] == 3
+    assert data["region2"] == {"A": 2, "B": 1}
+    assert data["tags"] == {"0": 2, "1": 1}
+
+    scoped = client.get("/api/routes/facets", params={"region1": "FacetR", "tag": 0b10}).json()
+    assert scoped["total"] == 1 and scoped["region2"] == {"A": 1}
+
+    assert client.patch(f"/api/routes/{second}", json={"region2": "B", "tags_bitmask": 0b100}).status_code == 200
+    data = client.get("/api/routes/facets", params={"region1": "FacetR"}).json()
+    assert data["region2"] == {"A": 1, "B": 2}
+    assert data["tags"] == {"0": 1, "2": 1}
+
+    assert client.get("/api/routes/facets", params={"tag": 0b11}).status_code == 400
+
+
+def test_response_cache_serves_reads_and_evicts_on_writes(client: TestClient):
+    login(client, email="cache@example.com")
+    region = "CacheR"
+    route_id = client.post("/api/routes", json={"title": "C", "region1": region, "open_url": "u"}).json()["id"]
+
+    def stats() -> dict:
+        return client.get("/api/routes/cache-stats").json()["responses"]
+
+    client.get(f"/api/routes/{route_id}")
+    before = stats()
+    assert client.get(f"/api/routes/{route_id}").json()["title"] == "C"
+    assert stats()["hits"] == before["hits"] + 1
+
+    listed = client.get("/api/routes", params={"region1": region, "sort": "popular"}).json()
+    assert [row["id"] for row in listed] == [route_id]
+
+    assert client.patch(f"/api/routes/{route_id}", json={"title": "C2"}).status_code == 200
+    assert client.get(f"/api/routes/{route_id}").json()["title"] == "C2"
+    assert client.get("/api/routes", params={"region1": region, "sort": "popular"}).json()[0]["title"] == "C2"
+
+    assert client.post(f"/api/routes/{route_id}/like").status_code == 200
+    assert client.get(f"/api/routes/{route_id}").json()["like_count"] == 1
+
+    other = client.post("/api/routes", json={"title": "D", "region1": region, "open_url": "u"}).json()["id"]
+    listed = client.get("/api/routes", params={"region1": region, "sort": "popular"}).json()
+    assert sorted(row["id"] for row in listed) == sorted([route_id, other])
+
+    assert client.get("/api/routes/999999").status_code == 404
+    data = client.get("/api/routes/cache-stats").json()
+    assert {"responses", "parse", "shortlinks"} <= data.keys()
+
+
+def test_route_reads_answer_304_until_a_write(client: TestClient):
+    login(client, email="etag@example.com")
+    route_id = client.post("/api/routes", json={"title": "E", "region1": "EtagR", "open_url": "u"}).json()["id"]
+
+    for path, params in [
+        (f"/api/routes/{route_id}", {}),
+        (f"/api/routes/{route_id}/photos", {}),
+        (f"/api/comments/route/{route_id}", {}),
+        ("/api/routes", {"region1": "EtagR", "sort": "popular"}),
+    ]:
+        r = client.get(path, params=params)
+        etag = r.headers["ETag"]
+        r = client.get(path, params=params, headers={"If-None-Match": etag})
+        assert r.status_code == 304 and r.content == b""
+        assert client.post(f"/api/routes/{route_id}/like").status_code == 200
+        assert client.post(f"/api/routes/{route_id}/unlike").status_code == 200
+        r = client.get(path, params=params, headers={"If-None-Match": etag})
+        assert r.status_code == 200 and r.headers["ETag"] != etag
+
+
+def test_opens_keep_etags_and_cached_reads_skip_the_database(client: TestClient, async_engine):
+    from sqlalchemy import event
+
+    route_id = client.post("/api/routes", json={"title": "O", "region1": "OpenEtagR", "open_url": "u"}).json()["id"]
+    etag = client.get(f"/api/routes/{route_id}").headers["ETag"]
+    assert client.post(f"/api/routes/{route_id}/open-track").status_code == 200
+
+    statements: list[str] = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        cached = client.get(f"/api/routes/{route_id}")
+        revalidated = client.get(f"/api/routes/{route_id}", headers={"If-None-Match": etag})
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+    assert cached.headers["ETag"] == etag and revalidated.status_code == 304
+    assert statements == []
+
+
+def test_list_cursor_pages_answer_304(client: TestClient):
+    login(client, email="etag-pages@example.com")
+    for i in range(3):
+        client.post("/api/routes", json={"title": f"P{i}", "region1": "EtagPages", "open_url": "u"})
+    first = client.get("/api/routes", params={"region1": "EtagPages", "limit": 2})
+    params = {"region1": "EtagPages", "limit": 2, "cursor": first.headers["X-Next-Cursor"]}
+    second = client.get("/api/routes", params=params)
+    assert len(second.json()) == 1
+    r = client.get("/api/routes", params=params, headers={"If-None-Match": second.headers["ETag"]})
+    assert r.status_code == 304
+
+
+def test_photo_count_is_filled_on_every_route_read(client: TestClient, tmp_path, monkeypatch):
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    login(client, email="photos@example.com")
+    files = [("photos", ("a.jpg", b"a", "image/jpeg")), ("photos", ("b.jpg", b"b", "image/jpeg"))]
+    r = client.post("/api/routes/with-photos", data={"title": "Ph", "open_url": "u"}, files=files)
+    assert r.status_code == 200
+    route_id = r.json()["id"]
+    assert r.json()["photo_count"] == 2
+    client.patch(f"/api/routes/{route_id}", json={"region1": "PhotoR"})
+    client.post(f"/api/bookmarks/route/{route_id}")
+
+    detail = client.get(f"/api/routes/{route_id}").json()
+    listed = client.get("/api/routes", params={"region1": "PhotoR"}).json()
+    mine = [row for row in client.get("/api/routes/mine").json() if row["id"] == route_id]
+    bookmarked = [row for row in client.get("/api/bookmarks/").json() if row["id"] == route_id]
+    for row in (detail, listed[0], mine[0], bookmarked[0]):
+        assert row["has_photos"] is True and row["photo_count"] == 2
+    assert len(client.get(f"/api/routes/{route_id}/photos").json()) == 2
+
+
+def test_full_route_detail_in_fixed_queries(client: TestClient, async_engine):
+    from sqlalchemy import event
+
+    login(client, email="full@example.com")
+
+    def make(n: int) -> int:
+        points = [{"lat": 37.5 + i / 100, "lng": 127.0, "name": f"p{i}"} for i in range(n)]
+        route_id = client.post("/api/routes", json={"title": "Full", "open_url": "u", "points": points}).json()["id"]
+        for i in range(n):
+            client.post(f"/api/comments/route/{route_id}", json={"content": f"c{i}"})
+        return route_id
+
+    small, large = make(1), make(6)
+    client.post(f"/api/routes/{large}/like")
+    client.post(f"/api/bookmarks/route/{large}")
+
+    statements: list[str] = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    try:
+        counts = []
+        for route_id in (small, large):
+            statements.clear()
+            r = client.get(f"/api/routes/{route_id}/full", params={"comment_limit": 5})
+            assert r.status_code == 200
+            counts.append(len(statements))
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+    assert counts[0] == counts[1]
+
+    data = r.json()
+    assert data["route"]["id"] == large
+    assert [p["name"] for p in data["points"]] == [f"p{i}" for i in range(6)]
+    assert len(data["comments"]) == 5
+    assert data["liked"] is True and data["bookmarked"] is True
+    assert client.get("/api/routes/999999/full").status_code == 404
+
+
+def test_nearby_routes_are_exact_and_sorted(client: TestClient):
+    login(client, email="nearby@example.com")
+
+    def make(lat: float, lng: float) -> int:
+        payload = {"title": "N", "open_url": "u", "points": [{"lat": lat, "lng": lng}, {"lat": lat + 1, "lng": lng}]}
+        return client.post("/api/routes", json=payload).json()["id"]
+
+    # ~0.1 km, ~5.5 km and ~22 km north of (10, 10); the far one is just outside a 20 km radius
+    near, mid, far = make(10.001, 10.0), make(10.05, 10.0), make(10.2, 10.0)
+    r = client.get("/api/routes/nearby", params={"lat": 10.0, "lng": 10.0, "radius_km": 20})
+    assert r.status_code == 200
+    rows = r.json()
+    assert [row["id"] for row in rows] == [near, mid]
+    assert abs(rows[0]["distance_km"] - 0.111) < 0.01
+    assert abs(rows[1]["distance_km"] - 5.56) < 0.05
+
+    # moving the far route's waypoints brings it in
+    assert client.patch(f"/api/routes/{far}", json={"points": [{"lat": 10.0, "lng": 10.002}]}).status_code == 200
+    ids = [row["id"] for row in client.get("/api/routes/nearby", params={"lat": 10.0, "lng": 10.0, "radius_km": 20}).json()]
+    assert ids == [near, far, mid]
+    assert client.get("/api/routes/nearby", params={"lat": 10.0, "lng": 10.0, "radius_km": 500}).status_code == 422
+
+
+def test_non_finite_points_are_rejected_before_indexing(client: TestClient):
+    login(client, email="nan@example.com")
+    # Python's JSON decoder accepts NaN/Infinity; grid cells need finite coordinates
+    body = '{"title": "N", "open_url": "u", "points": [{"lat": NaN, "lng": 1.0}]}'
+    r = client.post("/api/routes", content=body, headers={"Content-Type": "application/json"})
+    assert r.status_code == 422
+    assert r.json()["detail"][0]["loc"] == ["body", "points", 0, "lat"]
+    route_id = create_sample_route(client)
+    body = '{"points": [{"lat": 1.0, "lng": Infinity}]}'
+    r = client.patch(f"/api/routes/{route_id}", content=body, headers={"Content-Type": "application/json"})
+    assert r.status_code == 422
+    assert client.get("/api/routes/nearby", params={"lat": "nan", "lng": 10.0}).status_code == 422
+
+
+def test_nearby_at_max_radius_keeps_per_row_ranges(client: TestClient, async_engine):
+    from sqlalchemy import event
+    from app.services.geo import grid_cell_ranges, radius_box
+    from app.services.spatial import NEARBY_MAX_RADIUS_KM, _MAX_CELL_RANGES
+
+    login(client, email="nearby-max@example.com")
+    rows = len(grid_cell_ranges(*radius_box(20.0, 30.0, NEARBY_MAX_RADIUS_KM)))
+    assert rows <= _MAX_CELL_RANGES
+
+    def make(lat: float, lng: float) -> int:
+        return client.post("/api/routes", json={"title": "M", "open_url": "u", "points": [{"lat": lat, "lng": lng}]}).json()["id"]
+
+    # ~99 km north: inside the largest radius; same latitude band far east: outside
+    edge, _ = make(20.89, 30.0), make(20.89, 90.0)
+    statements: list[str] = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        r = client.get("/api/routes/nearby", params={"lat": 20.0, "lng": 30.0, "radius_km": NEARBY_MAX_RADIUS_KM})
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+    assert [row["id"] for row in r.json()] == [edge]
+    # one cell range per grid row (plus the exact lat/lng filters), not one span over whole bands
+    (points_sql,) = [s for s in statements if "FROM route_points" in s]
+    assert points_sql.count("BETWEEN") == rows + 2
+
+
+def test_bbox_markers_cluster_when_dense(client: TestClient):
+    login(client, email="bbox@example.com")
+    ids = []
+    for i in range(6):
+        # two tight groups around (-20, 30) and (-20, 31)
+        lng = 30.0 + (i % 2) + (i // 2) * 0.001
+        payload = {"title": f"B{i}", "open_url": "u", "points": [{"lat": -20.0, "lng": lng}, {"lat": -20.0, "lng": lng}]}
+        ids.append(client.post("/api/routes", json=payload).json()["id"])
+    box = {"minLat": -21, "minLng": 29, "maxLat": -19, "maxLng": 32, "zoom": 8}
+
+    data = client.get("/api/routes/in-bbox", params=box).json()
+    assert data["total"] == 6 and data["clustered"] is False
+    assert sorted(m["route_id"] for m in data["markers"]) == sorted(ids)
+    assert {m["title"] for m in data["markers"]} == {f"B{i}" for i in range(6)}
+
+    data = client.get("/api/routes/in-bbox", params={**box, "max_markers": 2}).json()
+    assert data["clustered"] is True
+    assert sorted(m["count"] for m in data["markers"]) == [3, 3]
+    assert sorted(round(m["lng"]) for m in data["markers"]) == [30, 31]
+
+    assert client.get("/api/routes/in-bbox", params={**box, "minLat": 0}).status_code == 400
+
+
+def test_tall_bbox_coarsens_ranges_and_returns_one_row_per_route(client: TestClient, async_engine):
+    from sqlalchemy import event
+    from app.services.spatial import _MAX_CELL_RANGES
+
+    login(client, email="bbox-tall@example.com")
+    # first point outside the box, then three inside; the marker is the first one inside
+    inside = [{"lat": -60.0 + i, "lng": 140.0} for i in range(3)]
+    payload = {"title": "T", "open_url": "u", "points": [{"lat": -70.0, "lng": 140.0}, *inside]}
+    route_id = client.post("/api/routes", json=payload).json()["id"]
+
+    statements: list[str] = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    # ~500 grid rows tall
+    box = {"minLat": -65, "minLng": 139, "maxLat": -55, "maxLng": 141, "zoom": 4}
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        data = client.get("/api/routes/in-bbox", params=box).json()
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+    assert data["total"] == 1
+    assert (data["markers"][0]["route_id"], data["markers"][0]["lat"]) == (route_id, -60.0)
+    (points_sql,) = [s for s in statements if "FROM route_points" in s]
+    assert "GROUP BY" in points_sql
+    assert 2 < points_sql.count("BETWEEN") <= _MAX_CELL_RANGES + 2
+
+
+def test_near_duplicate_routes_are_flagged(client: TestClient):
+    login(client, email="dupes@example.com")
+    course = [{"lat": 33.30, "lng": 126.20}, {"lat": 33.35, "lng": 126.40}, {"lat": 33.45, "lng": 126.55}]
+    original = client.post("/api/routes", json={"title": "Jeju west", "open_url": "u", "points": course}).json()
+    assert original["similar_route_ids"] == []
+
+    # same course, one extra waypoint nudged off the line
+    reshared = course[:2] + [{"lat": 33.401, "lng": 126.475}] + course[2:]
+    r = client.post("/api/routes/similar", json={"points": reshared})
+    assert [(row["route_id"], row["title"]) for row in r.json()] == [(original["id"], "Jeju west")]
+    assert r.json()[0]["score"] >= 0.5
+
+    dupe = client.post("/api/routes", json={"title": "Jeju west again", "open_url": "u", "points": reshared}).json()
+    assert dupe["similar_route_ids"] == [original["id"]]
+    assert [row["route_id"] for row in client.get(f"/api/routes/{original['id']}/similar").json()] == [dupe["id"]]
+
+    elsewhere = [{"lat": 35.10, "lng": 129.00}, {"lat": 35.20, "lng": 129.20}]
+    assert client.post("/api/routes/similar", json={"points": elsewhere}).json() == []
+    # moving the duplicate away drops it from the index
+    assert client.patch(f"/api/routes/{dupe['id']}", json={"points": elsewhere}).json()["similar_route_ids"] == []
+    assert client.get(f"/api/routes/{original['id']}/similar").json() == []
+
+
+def test_route_geometry_is_packed_on_the_route(client: TestClient):
+    import numpy as np
+
+    login(client, email="geometry@example.com")
+    points = [{"lat": 37.5665, "lng": 126.978}, {"lat": 37.60123456, "lng": 127.0}]
+    route_id = client.post("/api/routes", json={"title": "G", "open_url": "u", "points": points}).json()["id"]
+
+    coords = client.get(f"/api/routes/{route_id}/geometry").json()["coords"]
+    assert np.allclose(coords, [[37.5665, 126.978], [37.60123456, 127.0]], atol=1e-7)
+
+    r = client.get(f"/api/routes/{route_id}/geometry", params={"format": "packed"})
+    scale = int(r.headers["X-Geometry-Scale"])
+    packed = np.frombuffer(r.content, dtype="<i4").reshape(-1, 2)
+    assert packed.tolist() == [[375665000, 1269780000], [376012346, 1270000000]] and scale == 10_000_000
+
+    assert client.patch(f"/api/routes/{route_id}", json={"points": [{"lat": 1.5, "lng": 2.5}]}).status_code == 200
+    assert client.get(f"/api/routes/{route_id}/geometry").json()["coords"] == [[1.5, 2.5]]
+    # route_points stay in step for names and the spatial index
+    assert [p["lat"] for p in client.get(f"/api/routes/{route_id}/full").json()["points"]] == [1.5]
+    assert client.get("/api/routes/999999/geometry").status_code == 404
+
+
+def test_out_of_range_points_are_rejected(client: TestClient):
+    from app.services.geometry import pack_geometry
+
+    login(client, email="range@example.com")
+    # 500 degrees would wrap to -214.7483648 once packed into int32 fixed point
+    bad = [{"lat": 500, "lng": 127.0}, {"lat": 37.5, "lng": 127.0}]
+    assert client.post("/api/routes", json={"title": "R", "open_url": "u", "points": bad}).status_code == 422
+    route_id = create_sample_route(client)
+    assert client.patch(f"/api/routes/{route_id}", json={"points": [{"lat": 1, "lng": 181}]}).status_code == 422
+    assert len(client.get(f"/api/routes/{route_id}/geometry").json()["coords"]) == 2
+
+    # the with-photos form field follows the same rules instead of raw json.loads
+    before = len(client.get("/api/routes/mine").json())
+    r = client.post("/api/routes/with-photos", data={"title": "R", "open_url": "u", "points": '[{"lat": -91, "lng": 0}]'})
+    assert r.status_code == 422
+    assert client.post("/api/routes/with-photos", data={"title": "R", "open_url": "u", "points": "not json"}).status_code == 422
+    assert len(client.get("/api/routes/mine").json()) == before
+    ok = client.post("/api/routes/with-photos", data={"title": "R", "open_url": "u", "points": '[{"lat": 37.1, "lng": 127.1}, {"lat": 37.2, "lng": 127.2}]'})
+    assert ok.status_code == 200 and ok.json()["length_km"] > 0
+
+    with pytest.raises(ValueError):
+        pack_geometry([(90.5, 0.0)])
+
+
+def test_search_ranks_korean_text_with_bigrams(client: TestClient):
+    login(client, email="search@example.com")
+
+    def make(title: str, summary: str | None = None, names: list[str] | None = None) -> int:
+        points = [{"lat": 37.0, "lng": 127.0, "name": name} for name in names or []]
+        payload = {"title": title, "summary": summary, "open_url": "u", "points": points}
+        return client.post("/api/routes", json=payload).json()["id"]
+
+    fortress = make("남한산성 와인딩 코스", "성남에서 출발해 남한산성까지")
+    tunnel = make("퇴근길 드라이브", names=["남한산성입구", "광주"])
+    other = make("북악스카이웨이 야경")
+
+    rows = client.get("/api/routes/search", params={"q": "남한산성"}).json()
+    assert [row["id"] for row in rows] == [fortress, tunnel]
+    assert rows[0]["score"] > rows[1]["score"]
+    # particles glued to the noun still match
+    assert [row["id"] for row in client.get("/api/routes/search", params={"q": "북악스카이웨이를"}).json()] == [other]
+
+    first = client.get("/api/routes/search", params={"q": "남한산성", "limit": 1})
+    assert first.headers["X-Total-Count"] == "2"
+    rest = client.get("/api/routes/search", params={"q": "남한산성", "limit": 1, "cursor": first.headers["X-Next-Cursor"]})
+    assert [row["id"] for row in first.json() + rest.json()] == [fortress, tunnel]
+    assert "X-Next-Cursor" not in rest.headers
+    assert rest.headers["X-Total-Count"] == "2"
+
+    assert client.patch(f"/api/routes/{other}", json={"title": "남한산성 야경"}).status_code == 200
+    assert other in [row["id"] for row in client.get("/api/routes/search", params={"q": "남한산성"}).json()]
+    assert client.get("/api/routes/search", params={"q": "없는코스이름"}).json() == []
+
+
+def test_search_terms_differing_only_in_accents_are_distinct():
+    from sqlalchemy.dialects import mysql
+    from sqlalchemy.schema import CreateTable
+    from app.db.models import RouteSearchPosting
+    from app.services.search import route_terms
+
+    # 'fé' and 'fe' are separate postings of one route, so the MySQL primary key
+    # must compare them byte for byte, not under the accent-folding default collation
+    terms = route_terms("café cafe straße strasse", None, None, None, [])
+    assert {"fé", "fe", "ße", "ss"} <= set(terms)
+    ddl = str(CreateTable(RouteSearchPosting.__table__).compile(dialect=mysql.dialect()))
+    assert "term VARCHAR(32) COLLATE utf8mb4_bin" in ddl
+
+
+def test_length_is_computed_on_write_and_filterable(client: TestClient):
+    login(client, email="length@example.com")
+    region = "LengthR"
+
+    def make(lat_span: float, **extra) -> dict:
+        # due north from the equator: 1 degree of latitude is ~111.2 km
+        points = [{"lat": 0.0, "lng": 50.0}, {"lat": lat_span / 2, "lng": 50.0}, {"lat": lat_span, "lng": 50.0}]
+        payload = {"title": "L", "region1": region, "open_url": "u", "points": points, "length_km": 999, **extra}
+        return client.post("/api/routes", json=payload).json()
+
+    short = make(0.1)
+    long = make(1.0, duration_min=100)
+    assert abs(short["length_km"] - 11.12) < 0.05
+    assert short["duration_min"] == round(short["length_km"] / 45.0 * 60)
+    assert abs(long["length_km"] - 111.19) < 0.05 and long["duration_min"] == 100
+
+    def ids(**params) -> list[int]:
+        return [row["id"] for row in client.get("/api/routes", params={"region1": region, **params}).json()]
+
+    assert ids(sort="length") == [long["id"], short["id"]]
+    assert ids(min_km=50) == [long["id"]]
+    assert ids(max_km=50) == [short["id"]]
+
+    moved = client.patch(f"/api/routes/{short['id']}", json={"points": [{"lat": 0.0, "lng": 50.0}, {"lat": 2.0, "lng": 50.0}]})
+    assert moved.status_code == 200
+    assert ids(min_km=50, sort="length") == [short["id"], long["id"]]
+    # a stored duration is kept when only the points change
+    assert moved.json()["duration_min"] == short["duration_min"]
+    timed = client.patch(f"/api/routes/{long['id']}", json={"duration_min": 120})
+    assert timed.json()["duration_min"] == 120
+    repointed = client.patch(f"/api/routes/{long['id']}", json={"points": [{"lat": 0.0, "lng": 50.0}, {"lat": 0.5, "lng": 50.0}]})
+    assert repointed.json()["duration_min"] == 120
+    long = client.patch(f"/api/routes/{long['id']}", json={"points": [{"lat": 0.0, "lng": 50.0}, {"lat": 1.0, "lng": 50.0}]}).json()
+    assert long["duration_min"] == 120
+
+    # the stored length only ever comes from the points; clearing them keeps the duration
+    cleared = client.patch(f"/api/routes/{short['id']}", json={"points": []})
+    assert cleared.status_code == 200
+    assert cleared.json()["length_km"] is None and cleared.json()["duration_min"] == short["duration_min"]
+    assert ids(sort="length") == [long["id"]] and ids(min_km=0) == [long["id"]]
+    assert client.patch(f"/api/routes/{long['id']}", json={"length_km": 999}).json()["length_km"] == long["length_km"]
+    pointless = client.post("/api/routes", json={"title": "L", "region1": region, "open_url": "u", "length_km": 5}).json()
+    assert pointless["length_km"] is None
+
+
+def test_curviness_is_computed_and_sortable(client: TestClient):
+    login(client, email="curvy@example.com")
+    region = "CurvyR"
+
+    def make(points: list[tuple[float, float]]) -> dict:
+        payload = {"title": "C", "region1": region, "open_url": "u", "points": [{"lat": a, "lng": b} for a, b in points]}
+        return client.post("/api/routes", json=payload).json()
+
+    straight = make([(1.0, 60.0), (1.0, 60.01), (1.0, 60.02)])
+    # staircase: a 90 degree turn every ~1.1 km
+    stairs = make([(1.0, 61.0), (1.0, 61.01), (1.01, 61.01), (1.01, 61.02), (1.02, 61.02)])
+    assert straight["curviness"] == 0
+    assert abs(stairs["curviness"] - 270 / stairs["length_km"]) < 1
+
+    def ids(**params) -> list[int]:
+        return [row["id"] for row in client.get("/api/routes", params={"region1": region, **params}).json()]
+
+    assert ids(sort="curvy") == [stairs["id"], straight["id"]]
+    assert ids(min_curviness=10) == [stairs["id"]]
+
+    cleared = client.patch(f"/api/routes/{stairs['id']}", json={"points": []})
+    assert cleared.status_code == 200 and cleared.json()["curviness"] is None
+    assert ids(sort="curvy") == [straight["id"]]
+    assert ids(min_curviness=0) == [straight["id"]]
+
+
+def test_fast_json_lists_match_response_model_output(client: TestClient, monkeypatch):
+    from app.core.config import settings
+
+    login(client, email="fastjson@example.com")
+    region = "FastJsonR"
+    ids = []
+    for i in range(3):
+        payload = {"title": f"코스 {i}", "region1": region, "open_url": "u", "points": [{"lat": 2.0, "lng": 70.0 + i}, {"lat": 2.1, "lng": 70.0 + i}]}
+        ids.append(client.post("/api/routes", json=payload).json()["id"])
+    assert client.post(f"/api/bookmarks/route/{ids[0]}").status_code == 200
+
+    requests = [
+        ("/api/routes", {"region1": region, "limit": 2, "include_total": True}),
+        ("/api/routes", {"region1": region, "with_state": True}),
+        ("/api/routes/mine", {"with_state": True}),
+        ("/api/bookmarks/", {}),
+    ]
+
+    def fetch() -> list[tuple]:
+        out = []
+        for path, params in requests:
+            r = client.get(path, params=params)
+            assert r.status_code == 200 and r.headers["content-type"] == "application/json"
+            out.append((r.json(), r.headers.get("X-Next-Cursor"), r.headers.get("X-Total-Count"), r.headers.get("ETag")))
+        return out
+
+    monkeypatch.setattr(settings, "fast_json_responses", False)
+    expected = fetch()
+    monkeypatch.setattr(settings, "fast_json_responses", True)
+    assert fetch() == expected
+    assert expected[0][1] and expected[0][2] == "3" and expected[0][3]
+    assert {row["id"]: row["viewer_state"]["bookmarked"] for row in expected[1][0]} == {ids[0]: True, ids[1]: False, ids[2]: False}
+    assert [row["id"] for row in expected[3][0]] == [ids[0]]
+
+
+def test_card_view_selects_only_card_columns(client: TestClient, async_engine):
+    from sqlalchemy import event
+
+    login(client, email="card@example.com")
+    region = "CardR"
+    for i in range(3):
+        payload = {"title": f"Card {i}", "summary": "s" * 500, "region1": region, "open_url": "https://example.com/" + "x" * 500, "stars_scenery": 4}
+        client.post("/api/routes", json=payload)
+
+    statements: list[str] = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        first = client.get("/api/routes", params={"region1": region, "view": "card", "sort": "latest", "limit": 2})
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+    listing = [s for s in statements if "FROM routes" in s]
+    assert listing and all("open_url" not in s and "summary" not in s for s in listing)
+
+    cards = first.json()
+    assert len(cards) == 2 and "open_url" not in cards[0] and "summary" not in cards[0]
+    full = {row["id"]: row for row in client.get("/api/routes", params={"region1": region, "sort": "latest"}).json()}
+    for c in cards:
+        assert {k: full[c["id"]][k] for k in c if k != "viewer_state"} == {k: v for k, v in c.items() if k != "viewer_state"}
+
+    # keyset cursors, ETags and the response cache are per view
+    rest = client.get("/api/routes", params={"region1": region, "view": "card", "sort": "latest", "limit": 2, "cursor": first.headers["X-Next-Cursor"]}).json()
+    assert [c["id"] for c in cards + rest] == list(full)
+    etag = first.headers["ETag"]
+    assert etag != client.get("/api/routes", params={"region1": region, "sort": "latest", "limit": 2}).headers["ETag"]
+    again = client.get("/api/routes", params={"region1": region, "view": "card", "sort": "latest", "limit": 2}, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+
+
+@pytest.mark.parametrize("native_upsert", [True, False])
+def test_facet_delta_upserts_new_cells(async_session_maker, event_loop, monkeypatch, native_upsert):
+    from sqlalchemy import select
+    from app.db.models import RouteFacetCount
+    from app.services import route_index
+    from app.services.route_index import apply_facet_delta
+
+    if not native_upsert:
+        # dialects without an upsert take the locked SELECT + INSERT/UPDATE path
+        monkeypatch.setattr(route_index, "_facet_upsert", lambda *args: None)
+    region = "UpsertR" if native_upsert else "UpsertFallbackR"
+    cell = (region, "A", 0b1)
+
+    async def apply(before, after) -> None:
+        # separate sessions/transactions, like two concurrent route creates
+        async with async_session_maker() as db:
+            await apply_facet_delta(db, before, after)
+            await db.commit()
+
+    async def counts() -> dict[int, int]:
+        async with async_session_maker() as db:
+            rows = (await db.execute(select(RouteFacetCount.tag_bit, RouteFacetCount.route_count).where(RouteFacetCount.region1 == region))).all()
+        return dict(rows)
+
+    event_loop.run_until_complete(apply(None, cell))
+    event_loop.run_until_complete(apply(None, cell))
+    assert event_loop.run_until_complete(counts()) == {-1: 2, 0: 2}
+    event_loop.run_until_complete(apply(cell, None))
+    assert event_loop.run_until_complete(counts()) == {-1: 1, 0: 1}
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.services.parser import resolve_naver_route
+from app.services.shortlinks import CircuitBreaker, ShortlinkExpander
+
+
+DIRECTIONS_URL = "https://map.naver.com/v5/directions/14142058.54,4518168.75,Start/14150000.00,4519000.00,End/car"
+
+
+class _RedirectHandler(BaseHTTPRequestHandler):
+    # Local stand-in for naver.me: /fast redirects immediately, /slow after a delay
+    def do_GET(self):
+        if self.path.startswith("/slow"):
+            time.sleep(0.5)
+        if self.path.startswith("/hop"):
+            self.send_response(302)
+            self.send_header("Location", "/fast")
+        else:
+            self.send_response(302)
+            self.send_header("Location", DIRECTIONS_URL)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture()
+def redirect_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RedirectHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_expand_follows_relative_redirects(redirect_server: str):
+    async def run():
+        expander = ShortlinkExpander(timeout=2.0)
+        try:
+            return await expander.expand(f"{redirect_server}/hop")
+        finally:
+            await expander.aclose()
+
+    assert asyncio.run(run()) == DIRECTIONS_URL
+
+
+def test_slow_shortlink_does_not_block_loop(redirect_server: str):
+    async def run():
+        expander = ShortlinkExpander(timeout=2.0)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            for _ in range(10):
+                await asyncio.sleep(0.02)
+                ticks += 1
+
+        try:
+            expanded, _ = await asyncio.gather(expander.expand(f"{redirect_server}/slow"), ticker())
+        finally:
+            await expander.aclose()
+        return expanded, ticks
+
+    expanded, ticks = asyncio.run(run())
+    assert expanded == DIRECTIONS_URL
+    assert ticks == 10
+
+
+def test_resolve_naver_route_with_stand_in_transport():
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.host == "naver.me"
+        return httpx.Response(302, headers={"Location": DIRECTIONS_URL})
+
+    async def run():
+        expander = ShortlinkExpander(transport=httpx.MockTransport(handler))
+        try:
+            return await resolve_naver_route("https://naver.me/abc123", expander=expander)
+        finally:
+            await expander.aclose()
+
+    r = asyncio.run(run())
+    assert r['meta']['source'] == 'web'
+    assert r['meta']['expandedUrl'] == DIRECTIONS_URL
+    assert r['openUrl'] == "https://naver.me/abc123"
+    assert r['start'] and r['dest']
+
+
+def test_resolve_naver_route_falls_back_on_error():
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectTimeout("upstream down", request=request)
+
+    async def run():
+        expander = ShortlinkExpander(transport=httpx.MockTransport(handler))
+        try:
+            return await resolve_naver_route("naver.me/abc123", expander=expander)
+        finally:
+            await expander.aclose()
+
+    r = asyncio.run(run())
+    assert r['meta']['source'] == 'web-short'
+    assert r['openUrl'] == "https://naver.me/abc123"
+
+
+def test_resolve_single_flight_and_cache():
+    calls = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return httpx.Response(302, headers={"Location": DIRECTIONS_URL})
+
+    async def run():
+        expander = ShortlinkExpander(transport=httpx.MockTransport(handler))
+        try:
+            first = await asyncio.gather(*(expander.resolve("https://naver.me/viral") for _ in range(5)))
+            again = await expander.resolve("https://naver.me/viral")
+        finally:
+            await expander.aclose()
+        return first, again
+
+    first, again = asyncio.run(run())
+    assert first == [DIRECTIONS_URL] * 5
+    assert again == DIRECTIONS_URL
+    assert calls == 1
+
+
+def test_resolve_negative_cache_and_circuit_breaker():
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        raise httpx.ConnectTimeout("upstream down", request=request)
+
+    async def run():
+        expander = ShortlinkExpander(
+            transport=httpx.MockTransport(handler),
+            breaker=CircuitBreaker(failure_threshold=2, reset_after_s=60),
+        )
+        try:
+            assert await expander.resolve("https://naver.me/a") is None
+            # failure is cached: no second upstream call
+            assert await expander.resolve("https://naver.me/a") is None
+            assert calls == 1
+            assert await expander.resolve("https://naver.me/b") is None
+            assert expander.breaker.state == 'open'
+            # circuit open: straight to fallback without touching upstream
+            r = await resolve_naver_route("https://naver.me/c", expander=expander)
+        finally:
+            await expander.aclose()
+        return r
+
+    r = asyncio.run(run())
+    assert calls == 2
+    assert r['meta']['source'] == 'web-short'
+
+
+def test_cancelled_resolve_is_not_a_failure():
+    started = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        started.set()
+        await asyncio.sleep(10)
+        return httpx.Response(302, headers={"Location": DIRECTIONS_URL})
+
+    async def run():
+        expander = ShortlinkExpander(
+            transport=httpx.MockTransport(handler),
+            breaker=CircuitBreaker(failure_threshold=1, reset_after_s=60),
+        )
+        try:
+            task = asyncio.create_task(expander.resolve("https://naver.me/gone"))
+            joined = asyncio.create_task(expander.resolve("https://naver.me/gone"))
+            await started.wait()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            # a caller that joined the cancelled flight falls back without waiting
+            assert await asyncio.wait_for(joined, 1) is None
+            assert "https://naver.me/gone" not in expander.cache
+            return expander.breaker.state, expander.breaker.failures
+        finally:
+            await expander.aclose()
+
+    assert asyncio.run(run()) == ('closed', 0)